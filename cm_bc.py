@@ -14,23 +14,30 @@ import time
 from typing import Optional, List
 import calendar
 
+from nse_csv import open_zip_member, save_csv, write_parquet
+from nse_http import ACCEPT_ENCODING, get_session
+
 
 class CMBhavcopyDownloader:
     """Download Cash Market (CM) bhavcopy data from NSE"""
     
-    def __init__(self, output_dir: str = r".\NSE_Downloads\CM_Bhavcopy"):
+    def __init__(self, output_dir: str = r".\NSE_Downloads\CM_Bhavcopy",
+                 parquet_dir: Optional[str] = None):
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
+        # Optional year/month partitioned Parquet copy of every download
+        self.parquet_dir = parquet_dir
+        
         # UDiFF format started from July 8, 2024
         self.udiff_start_date = datetime(2024, 7, 8)
         
-        self.session = requests.Session()
+        self.session = get_session()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,  # br/zstd only when their decoders are installed
             'Connection': 'keep-alive',
         }
     
@@ -54,22 +61,23 @@ class CMBhavcopyDownloader:
             response = self.session.get(url, headers=self.headers, timeout=30)
             
             if response.status_code == 200:
-                # Extract zip and read CSV
-                with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
-                    csv_filename = zip_file.namelist()[0]
-                    with zip_file.open(csv_filename) as csv_file:
-                        df = pd.read_csv(csv_file)
-                
-                print(f"✓ Downloaded {len(df)} records")
-                
-                # Save to disk
                 output_file = os.path.join(
                     self.output_dir, 
                     f"CM_UDiFF_{date.strftime('%Y%m%d')}.csv"
                 )
-                df.to_csv(output_file, index=False)
+                
+                # Extract zip and save CSV to disk
+                with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
+                    csv_filename = zip_file.namelist()[0]
+                    with open_zip_member(zip_file, csv_filename) as csv_file:
+                        records = save_csv(csv_file, output_file)
+                
+                print(f"✓ Downloaded {records} records")
                 print(f"✓ Saved to {output_file}")
                 
+                if self.parquet_dir:
+                    write_parquet(output_file, self.parquet_dir, date)
+                
                 return output_file
             else:
                 print(f"✗ Failed: HTTP {response.status_code}")
@@ -95,18 +103,19 @@ class CMBhavcopyDownloader:
             response = self.session.get(url, headers=self.headers, timeout=30)
             
             if response.status_code == 200:
-                df = pd.read_csv(io.StringIO(response.text))
-                
-                print(f"✓ Downloaded {len(df)} records")
-                
                 # Save to disk
                 output_file = os.path.join(
                     self.output_dir, 
                     f"CM_OLD_{date.strftime('%Y%m%d')}.csv"
                 )
-                df.to_csv(output_file, index=False)
+                records = save_csv(io.BytesIO(response.content), output_file)
+                
+                print(f"✓ Downloaded {records} records")
                 print(f"✓ Saved to {output_file}")
                 
+                if self.parquet_dir:
+                    write_parquet(output_file, self.parquet_dir, date)
+                
                 return output_file
             else:
                 print(f"✗ Failed: HTTP {response.status_code}")
@@ -15,6 +15,12 @@ from typing import List, Optional, Dict, Any
 import requests
 from requests.exceptions import ConnectionError, RequestException
 
+from bc import NSEBhavcopyDownloader
+from cm_bc import CMBhavcopyDownloader
+from nse_combined_oi_downloader import NSECombinedOIDownloader
+from nse_fii_statistics_downloader import NSEAPIDownloader as FIIStatisticsDownloader
+from nse_participant_oi_downloader import NSEAPIDownloader as ParticipantOIDownloader
+
 
 # Configuration
 BASE_URL = "http://127.0.0.1:5000/api"
@@ -130,8 +136,6 @@ class NSEDataDownloader:
             Downloaded file data/path or None if failed
         """
         try:
-            from cm_bc import CMBhavcopyDownloader
-            
             downloader = CMBhavcopyDownloader()
             date = datetime.strptime(date_str, "%Y-%m-%d")
             result = downloader.download_date(date)
@@ -154,8 +158,6 @@ class NSEDataDownloader:
             Downloaded file data/path or None if failed
         """
         try:
-            from bc import NSEBhavcopyDownloader
-            
             downloader = NSEBhavcopyDownloader()
             date = datetime.strptime(date_str, "%Y-%m-%d")
             result = downloader.download_date(date)
@@ -178,8 +180,6 @@ class NSEDataDownloader:
             Downloaded file data/path or None if failed
         """
         try:
-            from nse_combined_oi_downloader import NSECombinedOIDownloader
-            
             downloader = NSECombinedOIDownloader()
             
             if not downloader.init_session():
@@ -208,9 +208,7 @@ class NSEDataDownloader:
             Downloaded file data/path or None if failed
         """
         try:
-            from nse_fii_statistics_downloader import NSEAPIDownloader
-            
-            downloader = NSEAPIDownloader()
+            downloader = FIIStatisticsDownloader()
             
             # Convert date format to DD-MMM-YYYY
             date_formatted = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d-%b-%Y")
@@ -234,9 +232,7 @@ class NSEDataDownloader:
             Downloaded file data/path or None if failed
         """
         try:
-            from nse_participant_oi_downloader import NSEAPIDownloader
-            
-            downloader = NSEAPIDownloader()
+            downloader = ParticipantOIDownloader()
             
             # Convert date format to DD-MMM-YYYY
             date_formatted = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d-%b-%Y")
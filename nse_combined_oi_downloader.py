@@ -7,32 +7,70 @@ Handles the new NSE authentication and session requirements
 import requests
 from datetime import datetime, timedelta
 import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import nse_csv
+from nse_http import ACCEPT_ENCODING, RateLimiter, get_logger, get_session, get_trading_holidays
+
+# Read/write buffer size used when streaming downloads to disk
+CHUNK_SIZE = 64 * 1024
+
+logger = get_logger(__name__)
+
+BASE_URL = "https://www.nseindia.com"
+
+# URL templates, filled per date with str.format
+# The archives parameter is the pre-encoded "F&O - Combine Open Interest across exchanges" report config
+COMBINED_OI_URL = (
+    BASE_URL + "/api/reports?archives=%5B%7B%22name%22%3A%22F%26O%20-%20Combine%20Open%20Interest%20across%20exchanges%22%2C%22type%22%3A%22archives%22%2C%22category%22%3A%22derivatives%22%2C%22section%22%3A%22equity%22%7D%5D"
+    "&date={date_str}&type=equity&mode=single"
+)
+# Old direct file pattern that might still work for some files
+COMBINED_OI_ALT_URL = "https://archives.nseindia.com/content/nsccl/fao_combine_oi_{file_date}.csv"
 
 class NSECombinedOIDownloader:
     def __init__(self):
-        self.base_url = "https://www.nseindia.com"
+        self.base_url = BASE_URL
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,  # br/zstd only when their decoders are installed
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.session = get_session()
+        # Shared by all worker threads to stay under NSE's request throttle
+        self.rate_limiter = RateLimiter(calls=5, per=1)
+    
+    def _get(self, url, reinit_on_403=True, **kwargs):
+        """Rate-limited GET on the shared session"""
+        self.rate_limiter.wait()
+        response = self.session.get(url, headers=self.headers, **kwargs)
+        
+        # Cookies expired - warm the session up again and retry once
+        if response.status_code == 403 and reinit_on_403:
+            response.close()
+            self.init_session()
+            self.rate_limiter.wait()
+            response = self.session.get(url, headers=self.headers, **kwargs)
+        
+        return response
     
     def init_session(self):
         """Initialize session by visiting the main page first"""
         try:
             # Visit main page to get cookies
             url = f"{self.base_url}/all-reports-derivatives"
-            response = self.session.get(url, timeout=10)
+            response = self._get(url, reinit_on_403=False, timeout=10)
             response.raise_for_status()
-            print("✓ Session initialized successfully")
+            logger.info("✓ Session initialized successfully")
             return True
         except Exception as e:
-            print(f"✗ Failed to initialize session: {str(e)}")
+            logger.error("✗ Failed to initialize session: %s", e)
             return False
     
     def download_combined_oi(self, date=None, output_dir="./NSE_Downloads/FO_Combined_OI"):
@@ -48,109 +86,123 @@ class NSECombinedOIDownloader:
             # Use previous trading day (assuming today is a trading day)
             date = datetime.now() - timedelta(days=1)
         
-        # Format date for NSE (DD-MMM-YYYY uppercase)
+        # Validate string input by parsing it, rather than pasting it into the URL
         if isinstance(date, str):
-            date_str = date
-        else:
-            date_str = date.strftime("%d-%b-%Y").upper()
+            date = datetime.strptime(date, "%d-%b-%Y")
         
+        # Format date for NSE (DD-MMM-YYYY uppercase)
+        date_str = date.strftime("%d-%b-%Y").upper()
         # NSE file naming format: ddMMMyyyy (e.g., 11JAN2024)
-        file_date = date_str.replace('-', '').upper()
-        
-        # The download URL pattern for Combined OI
-        # Note: NSE may use different patterns, this is the most common one
-        download_url = f"{self.base_url}/api/reports?archives=%5B%7B%22name%22%3A%22F%26O%20-%20Combine%20Open%20Interest%20across%20exchanges%22%2C%22type%22%3A%22archives%22%2C%22category%22%3A%22derivatives%22%2C%22section%22%3A%22equity%22%7D%5D&date={date_str}&type=equity&mode=single"
+        file_date = date.strftime("%d%b%Y").upper()
+        # Saved files are named by YYYYMMDD (e.g., combined_oi_20240111.csv)
+        formatted_date = date.strftime("%Y%m%d")
         
-        # Alternative direct file URL (if above doesn't work)
-        # This is based on the old pattern that might still work for some files
-        alt_url = f"https://archives.nseindia.com/content/nsccl/fao_combine_oi_{file_date}.csv"
+        # The download URL pattern for Combined OI, with the direct file URL as fallback
+        download_url = COMBINED_OI_URL.format(date_str=date_str)
+        alt_url = COMBINED_OI_ALT_URL.format(file_date=file_date)
         
         try:
             # Try the API endpoint first
             # print(f"Attempting to download Combined OI for {date_str}...")
-            response = self.session.get(download_url, timeout=15)
+            response = self._get(download_url, timeout=15, stream=True)
             
             # If API doesn't work, try direct file URL
             if response.status_code != 200:
-                print(f"API failed, trying direct URL...")
-                response = self.session.get(alt_url, timeout=15)
+                logger.info("API failed, trying direct URL...")
+                response.close()
+                response = self._get(alt_url, timeout=15, stream=True)
             
-            response.raise_for_status()
-            
-            # Create output directory if it doesn't exist
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Save the file
-            filename = f"combined_oi_{file_date}.csv"
-            # print(filename, file_date)
-            filepath = os.path.join(output_dir, filename)
-            import io
-            import zipfile
-            with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
-                    csv_filename = zip_file.namelist()[0]
-                    # print(csv_filename)
-                    with zip_file.open(csv_filename) as csv_file:
-                        import pandas as pd
-                        df = pd.read_csv(csv_file)
-                        # print(df)
-                    filename = f"combined_oi_{pd.to_datetime(file_date).strftime('%Y%m%d')}.csv"
-                    filepath = os.path.join("./NSE_Downloads/FO_Combined_OI", filename)
-                    df.to_csv(filepath, index=False)
+            with response:
+                response.raise_for_status()
+                logger.debug("  Content-Encoding: %s", response.headers.get('Content-Encoding'))
                 
-                    # file_size = os.path.getsize(filepath) / (1024 * 1024)
-                    # self.stats['total_size_mb'] += file_size
-                    # self.stats['successful_downloads'] += 1
-
-            
-            # with open(filepath, 'wb') as f:
-            #     import io
-            #     print(response.content)
-            #         # dir(io.BytesIO(response.content))
-            #         # )
-            #     byte_stream = io.BytesIO(response.content)
-            #     f.write(byte_stream.getvalue())
+                # Create output directory if it doesn't exist
+                os.makedirs(output_dir, exist_ok=True)
+                
+                # Spool the zip to a temp file (kept in memory only while small)
+                with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 16) as tmp:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        tmp.write(chunk)
+                    file_size = tmp.tell()
+                    tmp.seek(0)
+                    
+                    # The CSV is saved unchanged, only the file name is rewritten
+                    with zipfile.ZipFile(tmp) as zip_file:
+                        csv_filename = zip_file.namelist()[0]
+                        filename = f"combined_oi_{formatted_date}.csv"
+                        filepath = os.path.join("./NSE_Downloads/FO_Combined_OI", filename)
+                        # Extract to a .part file and move it into place once complete,
+                        # so a CRC or write error never leaves a truncated CSV
+                        part_path = filepath + '.part'
+                        try:
+                            with nse_csv.open_zip_member(zip_file, csv_filename) as src, open(part_path, 'wb') as dst:
+                                shutil.copyfileobj(src, dst, length=CHUNK_SIZE)
+                            os.replace(part_path, filepath)
+                        except Exception:
+                            if os.path.exists(part_path):
+                                os.remove(part_path)
+                            raise
             
-            print(f"✓ Downloaded successfully: {filepath}")
-            print(f"  File size: {len(response.content)} bytes")
+            logger.info("✓ Downloaded successfully: %s", filepath)
+            logger.debug("  File size: %d bytes", file_size)
             return filepath
             
         except requests.exceptions.HTTPError as e:
-            print(f"✗ HTTP Error: {e}")
-            print(f"  Status Code: {response.status_code}")
+            logger.error("✗ HTTP Error: %s", e)
+            logger.error("  Status Code: %s", response.status_code)
             if response.status_code == 404:
-                print(f"  File not found. Possible reasons:")
-                print(f"  - {date_str} was not a trading day")
-                print(f"  - Data not yet available")
-                print(f"  - URL structure has changed")
+                logger.error("  File not found. Possible reasons:")
+                logger.error("  - %s was not a trading day", date_str)
+                logger.error("  - Data not yet available")
+                logger.error("  - URL structure has changed")
         except Exception as e:
-            print(f"✗ Failed to download: {str(e)}")
+            logger.error("✗ Failed to download: %s", e)
         
         return None
     
-    def download_date_range(self, start_date, end_date, output_dir="./nse_data"):
-        """Download Combined OI for a date range"""
-        current = start_date
+    def download_date_range(self, start_date, end_date, output_dir="./nse_data", max_workers=8):
+        """Download Combined OI for a date range using a pool of worker threads"""
         successful = []
         failed = []
+        results = {}
         
+        holidays = get_trading_holidays()
+        dates = []
+        current = start_date
         while current <= end_date:
-            # Skip weekends (Saturday=5, Sunday=6)
-            if current.weekday() < 5:  
-                result = self.download_combined_oi(current, output_dir)
-                if result:
-                    successful.append(current.strftime("%d-%b-%Y"))
-                else:
-                    failed.append(current.strftime("%d-%b-%Y"))
-            
+            # Skip weekends (Saturday=5, Sunday=6) and NSE holidays
+            if current.weekday() < 5 and current.date() not in holidays:
+                dates.append(current)
             current += timedelta(days=1)
         
-        print(f"\n{'='*50}")
-        print(f"Download Summary:")
-        print(f"  Successful: {len(successful)}")
-        print(f"  Failed: {len(failed)}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.download_combined_oi, date, output_dir): date
+                for date in dates
+            }
+            for future in as_completed(futures):
+                date = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error("✗ Failed to download %s: %s", date.strftime('%d-%b-%Y'), e)
+                    result = None
+                results[date] = result
+        
+        # Report in date order regardless of completion order
+        for date in dates:
+            if results.get(date):
+                successful.append(date.strftime("%d-%b-%Y"))
+            else:
+                failed.append(date.strftime("%d-%b-%Y"))
+        
+        logger.info("\n%s", '=' * 50)
+        logger.info("Download Summary:")
+        logger.info("  Successful: %d", len(successful))
+        logger.info("  Failed: %d", len(failed))
         if failed:
-            print(f"  Failed dates: {', '.join(failed)}")
-        print(f"{'='*50}\n")
+            logger.info("  Failed dates: %s", ', '.join(failed))
+        logger.info("%s\n", '=' * 50)
         
         return successful, failed
 
@@ -5,13 +5,54 @@ Downloads all available NSE data files for a given date or date range
 
 import requests
 import pandas as pd
+import sqlite3
 from datetime import datetime, timedelta
 import os
-import time
 import zipfile
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 
+from bc import NSEBhavcopyDownloader
+from nse_combined_oi_downloader import NSECombinedOIDownloader
+from nse_fii_statistics_downloader import NSEAPIDownloader as FIIStatisticsDownloader
+from nse_participant_oi_downloader import NSEAPIDownloader as ParticipantOIDownloader
+from nse_participant_tv_downloader import NSEAPIDownloader as ParticipantTVDownloader
+from nse_http import ACCEPT_ENCODING, RateLimiter, get_logger, get_session, get_trading_holidays
+
+# Read/write buffer size used when streaming downloads to disk
+CHUNK_SIZE = 64 * 1024
+
+logger = get_logger(__name__)
+
+# Download URL templates, filled per date with str.format
+EQUITY_BHAVCOPY_URL = "https://archives.nseindia.com/products/content/cm{date_str}bhav.csv.zip"
+CM_UDIFF_URL = "https://nsearchives.nseindia.com/products/dynaContent/common/productsSymbolMapping/BhavCopy_NSE_CM_0_0_0_{date_str}_F_0000.csv.zip"
+EQUITY_DELIVERABLE_URL = "https://archives.nseindia.com/products/content/sec_bhavdata_full_{date_str}.csv"
+INDICES_URL = "https://archives.nseindia.com/content/indices/ind_close_all_{date_str}.csv"
+VIX_URL = "https://nsearchives.nseindia.com/content/indices/india-vix-daily-{date_str}.csv"
+
+# NSE date formats: format_type -> (strftime pattern, uppercase)
+DATE_FORMATS = {
+    'DDMMMYYYYupper': ('%d%b%Y', True),     # 13DEC2024
+    'DDMMMYYYYlower': ('%d%b%Y', False),    # 13Dec2024
+    'DDMMYYYY': ('%d%m%Y', False),          # 13122024
+    'DDMMMYY': ('%d%b%y', True),            # 13DEC24
+    'YYYYMMDD': ('%Y%m%d', False),          # 20241213
+    'DD-MMM-YYYY': ('%d-%b-%Y', True),      # 13-DEC-2024
+}
+
+
+@lru_cache(maxsize=4096)
+def _format_date(ordinal, format_type):
+    """Format the day `ordinal` as `format_type` (unknown types use DDMMYYYY)"""
+    pattern, upper = DATE_FORMATS.get(format_type, DATE_FORMATS['DDMMYYYY'])
+    formatted = datetime.fromordinal(ordinal).strftime(pattern)
+    return formatted.upper() if upper else formatted
+
+
 class NSEDataDownloader:
     def __init__(self, output_dir="NSE_Downloads"):
         """Initialize the NSE Data Downloader"""
@@ -35,15 +76,22 @@ class NSEDataDownloader:
         for subdir in self.subdirs.values():
             subdir.mkdir(exist_ok=True)
         
-        # Session with headers to mimic browser
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Shared session, with headers to mimic browser
+        self.session = get_session()
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': '*/*',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,  # br/zstd only when their decoders are installed
             'Connection': 'keep-alive'
-        })
+        }
+        
+        # NSE trading holidays, loaded on first use by is_trading_day
+        self._holidays = None
+        
+        # Sub-downloaders are created once and reused for every date
+        self._downloaders = {}
+        self._downloaders_lock = threading.Lock()
         
         self.stats = {
             'total_attempted': 0,
@@ -51,40 +99,120 @@ class NSEDataDownloader:
             'failed': 0,
             'skipped': 0
         }
+        self._stats_lock = threading.Lock()
+        # Shared by all worker threads to stay under NSE's request throttle
+        self.rate_limiter = RateLimiter(calls=5, per=1)
+        
+        # Manifest of downloaded files, one row per (kind, date)
+        self.manifest = sqlite3.connect(self.output_dir / 'manifest.db', check_same_thread=False)
+        self._manifest_lock = threading.Lock()
+        with self.manifest:
+            self.manifest.execute(
+                'CREATE TABLE IF NOT EXISTS files('
+                'kind TEXT, date TEXT, path TEXT, size INT, '
+                'PRIMARY KEY(kind, date))'
+            )
+    
+    def _is_downloaded(self, kind, date, output_path):
+        """
+        Check the manifest for a file, adopting files downloaded before it existed
+        
+        A manifest row only counts while its file is still on disk with the
+        recorded size; a stale row (file deleted or changed) is dropped so the
+        file is downloaded again.
+        """
+        key = (kind, date.strftime('%Y-%m-%d'))
+        with self._manifest_lock:
+            row = self.manifest.execute(
+                'SELECT path, size FROM files WHERE kind=? AND date=?', key
+            ).fetchone()
+        if row:
+            path, size = row
+            try:
+                # getsize raises for a missing file; a row without a size only needs the file
+                if os.path.getsize(path) == size or size is None:
+                    return True
+            except OSError:
+                pass
+            with self._manifest_lock, self.manifest:
+                self.manifest.execute('DELETE FROM files WHERE kind=? AND date=?', key)
+            return False
+        
+        if output_path.exists():
+            self._record_download(kind, date, output_path)
+            return True
+        return False
+    
+    def _record_download(self, kind, date, path):
+        """Add or update the manifest entry for a downloaded file"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        with self._manifest_lock, self.manifest:
+            self.manifest.execute(
+                'INSERT OR REPLACE INTO files(kind, date, path, size) VALUES (?, ?, ?, ?)',
+                (kind, date.strftime('%Y-%m-%d'), str(path), size)
+            )
+    
+    def _count(self, key):
+        """Increment a stats counter (safe to call from worker threads)"""
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def _get_downloader(self, key, factory):
+        """Return the cached sub-downloader for `key`, creating it on first use"""
+        with self._downloaders_lock:
+            if key not in self._downloaders:
+                self._downloaders[key] = factory()
+            return self._downloaders[key]
     
     def is_trading_day(self, date):
-        """Check if the date is a weekday (potential trading day)"""
-        return date.weekday() < 5
+        """Check if the date is a weekday and not an NSE trading holiday"""
+        if self._holidays is None:
+            self._holidays = get_trading_holidays()
+        return date.weekday() < 5 and date.date() not in self._holidays
     
     def format_date(self, date, format_type='DDMMMYYYYupper'):
         """Format date in various NSE-required formats"""
-        formats = {
-            'DDMMMYYYYupper': date.strftime('%d%b%Y').upper(),  # 13DEC2024
-            'DDMMMYYYYlower': date.strftime('%d%b%Y'),           # 13Dec2024
-            'DDMMYYYY': date.strftime('%d%m%Y'),                 # 13122024
-            'DDMMMYY': date.strftime('%d%b%y').upper(),          # 13DEC24
-            'YYYYMMDD': date.strftime('%Y%m%d'),                 # 20241213
-            'DD-MMM-YYYY': date.strftime('%d-%b-%Y').upper(),    # 13-DEC-2024
-        }
-        return formats.get(format_type, date.strftime('%d%m%Y'))
+        return _format_date(date.toordinal(), format_type)
     
-    def download_file(self, url, output_path, description=""):
-        """Download a file from URL and save to output_path"""
+    def download_file(self, url, output_path, description="", kind=None, date=None):
+        """
+        Download a file from URL and save to output_path
+        
+        When `kind` and `date` are given the file is recorded in the manifest.
+        """
+        # Write to a .part file and move it into place only once complete,
+        # so an interrupted download never passes the exists() checks
+        tmp_path = f"{output_path}.part"
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            self.rate_limiter.wait()
+            response = self.session.get(url, headers=self.headers, timeout=30, stream=True)
+            
+            with response:
+                response.raise_for_status()
+                logger.debug("  Content-Encoding: %s", response.headers.get('Content-Encoding'))
+                
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                os.replace(tmp_path, output_path)
             
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            if kind:
+                self._record_download(kind, date, output_path)
             
-            print(f"  [+] {description or os.path.basename(output_path)}")
-            self.stats['successful'] += 1
+            logger.info("  [+] %s", description or os.path.basename(output_path))
+            self._count('successful')
             # return True
             return output_path
             
-        except requests.exceptions.RequestException as e:
-            print(f"  [-] Failed: {description or os.path.basename(output_path)} - {str(e)[:50]}")
-            self.stats['failed'] += 1
+        except (requests.exceptions.RequestException, OSError) as e:
+            logger.error("  [-] Failed: %s - %s", description or os.path.basename(output_path), str(e)[:50])
+            self._count('failed')
+            # Drop the partial body so the next run starts clean
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return None
     
     def download_fo_bhavcopy(self, date):
@@ -95,14 +223,15 @@ class NSEDataDownloader:
         # url = f"https://nsearchives.nseindia.com/content/historical/DERIVATIVES/{date.year}/{date.strftime('%b').upper()}/{filename}"
         output_path = self.subdirs['fo_bhavcopy'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('fo_bhavcopy', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
-        from bc import NSEBhavcopyDownloader
-        downloader = NSEBhavcopyDownloader()
-        downloader.download_date(date)
+        self._count('total_attempted')
+        downloader = self._get_downloader('fo_bhavcopy', NSEBhavcopyDownloader)
+        result = downloader.download_date(date)
+        if result:
+            self._record_download('fo_bhavcopy', date, result)
         # return self.download_file(url, output_path, f"F&O Bhavcopy: {filename}")
     
     def download_fo_participant_oi(self, date):
@@ -112,15 +241,16 @@ class NSEDataDownloader:
         # url = f"https://archives.nseindia.com/content/nsccl/{filename}"
         output_path = self.subdirs['fo_participant_oi'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('fo_participant_oi', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
+        self._count('total_attempted')
         # return self.download_file(url, output_path, f"Participant OI: {filename}")
-        from nse_participant_oi_downloader import NSEAPIDownloader
-        downloader = NSEAPIDownloader()
-        downloader.download_participant_oi(f"{date_str}")
+        downloader = self._get_downloader('fo_participant_oi', ParticipantOIDownloader)
+        result = downloader.download_participant_oi(f"{date_str}")
+        if result:
+            self._record_download('fo_participant_oi', date, result)
 
 
     
@@ -131,15 +261,16 @@ class NSEDataDownloader:
         # url = f"https://archives.nseindia.com/content/nsccl/{filename}"
         output_path = self.subdirs['fo_participant_volume'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('fo_participant_volume', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
+        self._count('total_attempted')
         # return self.download_file(url, output_path, f"Participant Volume: {filename}")
-        from nse_participant_tv_downloader import NSEAPIDownloader
-        downloader = NSEAPIDownloader()
-        downloader.download_participant_tv(f"{date_str}")
+        downloader = self._get_downloader('fo_participant_volume', ParticipantTVDownloader)
+        result = downloader.download_participant_tv(f"{date_str}")
+        if result:
+            self._record_download('fo_participant_volume', date, result)
     
     def download_fo_combined_oi(self, date):
         """Download F&O Combined Open Interest across exchanges"""
@@ -148,15 +279,16 @@ class NSEDataDownloader:
         # url = f"https://archives.nseindia.com/content/nsccl/{filename}"
         output_path = self.subdirs['fo_combined_oi'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('fo_combined_oi', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
+        self._count('total_attempted')
         # return self.download_file(url, output_path, f"Combined OI: {filename}")
-        from nse_combined_oi_downloader import NSECombinedOIDownloader
-        downloader = NSECombinedOIDownloader()
-        downloader.download_combined_oi(date=f"{date_str}")
+        downloader = self._get_downloader('fo_combined_oi', NSECombinedOIDownloader)
+        result = downloader.download_combined_oi(date=f"{date_str}")
+        if result:
+            self._record_download('fo_combined_oi', date, result)
     
     def download_fii_statistics(self, date):
         """Download FII Derivatives Statistics"""
@@ -165,29 +297,31 @@ class NSEDataDownloader:
         # url = f"https://archives.nseindia.com/content/fo/{filename}"
         output_path = self.subdirs['fii_statistics'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('fii_statistics', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
+        self._count('total_attempted')
         # return self.download_file(url, output_path, f"FII Statistics: {filename}")
-        from nse_fii_statistics_downloader import NSEAPIDownloader
-        downloader = NSEAPIDownloader()
-        downloader.download_fii_statistics(date=f"{date_str}")
+        downloader = self._get_downloader('fii_statistics', FIIStatisticsDownloader)
+        result = downloader.download_fii_statistics(date=f"{date_str}", parse=False)
+        if result:
+            self._record_download('fii_statistics', date, result)
     
     def download_equity_bhavcopy(self, date):
         """Download Equity Bhavcopy (old format, pre-July 2024)"""
         date_str = self.format_date(date, 'DDMMYYYY')
         filename = f"cm{date_str}bhav.csv.zip"
-        url = f"https://archives.nseindia.com/products/content/{filename}"
+        url = EQUITY_BHAVCOPY_URL.format(date_str=date_str)
         output_path = self.subdirs['equity_bhavcopy'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('equity_bhavcopy', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
-        return self.download_file(url, output_path, f"Equity Bhavcopy: {filename}")
+        self._count('total_attempted')
+        return self.download_file(url, output_path, f"Equity Bhavcopy: {filename}",
+                                  kind='equity_bhavcopy', date=date)
     
     def download_cm_udiff_bhavcopy(self, date):
         """Download CM-UDiFF Common Bhavcopy (new format, post-July 2024)"""
@@ -197,15 +331,16 @@ class NSEDataDownloader:
         
         date_str = self.format_date(date, 'DD-MMM-YYYY')
         filename = f"BhavCopy_NSE_CM_0_0_0_{date_str}_F_0000.csv.zip"
-        url = f"https://nsearchives.nseindia.com/products/dynaContent/common/productsSymbolMapping/{filename}"
+        url = CM_UDIFF_URL.format(date_str=date_str)
         output_path = self.subdirs['cm_udiff'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('cm_udiff', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
-        return self.download_file(url, output_path, f"CM-UDiFF Bhavcopy: {filename}")
+        self._count('total_attempted')
+        return self.download_file(url, output_path, f"CM-UDiFF Bhavcopy: {filename}",
+                                  kind='cm_udiff', date=date)
     
     def download_equity_deliverable(self, date):
         """Download Equity Deliverable Data"""
@@ -221,19 +356,20 @@ class NSEDataDownloader:
         # filename = f"sec_bhavdata_full_{date_str2}.csv"
         date_str = date.strftime('%d%m%Y')
         filename = f"sec_bhavdata_full_{date_str}.csv"
-        urls = [f"https://archives.nseindia.com/products/content/{filename}"]
+        urls = [EQUITY_DELIVERABLE_URL.format(date_str=date_str)]
         date_str1 = self.format_date(date, 'YYYYMMDD')
         filename1 = f"sec_bhavdata_full_{date_str1}.csv"
         output_path = self.subdirs['equity_deliverable'] / filename1
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('equity_deliverable', date, output_path):
+            self._count('skipped')
             return output_path
         
-        self.stats['total_attempted'] += 1
+        self._count('total_attempted')
         
         for url in urls:
-            return self.download_file(url, output_path, f"Deliverable Data: {filename}")
+            return self.download_file(url, output_path, f"Deliverable Data: {filename}",
+                                      kind='equity_deliverable', date=date)
             if self.download_file(url, output_path, f"Deliverable Data: {filename}"):
                 return True
         
@@ -243,17 +379,18 @@ class NSEDataDownloader:
         """Download Indices Data"""
         date_str = self.format_date(date, 'DDMMYYYY')
         filename = f"ind_close_all_{date_str}.csv"
-        url = f"https://archives.nseindia.com/content/indices/{filename}"
+        url = INDICES_URL.format(date_str=date_str)
         date_str1 = self.format_date(date, 'YYYYMMDD')
         filename1 = f"ind_close_all_{date_str1}.csv"
         output_path = self.subdirs['indices'] / filename1
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('indices', date, output_path):
+            self._count('skipped')
             return output_path
         
-        self.stats['total_attempted'] += 1
-        return self.download_file(url, output_path, f"Indices: {filename}")
+        self._count('total_attempted')
+        return self.download_file(url, output_path, f"Indices: {filename}",
+                                  kind='indices', date=date)
     
     def download_vix(self, date):
         """Download India VIX Data"""
@@ -264,69 +401,87 @@ class NSEDataDownloader:
         # url = f"https://archives.nseindia.com/content/indices/{filename}"
         date_str = self.format_date(date, 'DDMMMYYYY')  # e.g., 31Dec2024
         filename = f"india-vix-daily-{date_str}.csv"
-        url = f"https://nsearchives.nseindia.com/content/indices/{filename}"
+        url = VIX_URL.format(date_str=date_str)
         output_path = self.subdirs['vix'] / filename
         
-        if output_path.exists():
-            self.stats['skipped'] += 1
+        if self._is_downloaded('vix', date, output_path):
+            self._count('skipped')
             return True
         
-        self.stats['total_attempted'] += 1
-        return self.download_file(url, output_path, f"VIX: {filename}")
+        self._count('total_attempted')
+        return self.download_file(url, output_path, f"VIX: {filename}",
+                                  kind='vix', date=date)
     
     def download_all_for_date(self, date):
         """Download all available data for a given date"""
         if not self.is_trading_day(date):
-            print(f"\nSkipping {date.strftime('%Y-%m-%d')} (Weekend)")
+            logger.debug("\nSkipping %s (Weekend/Holiday)", date.strftime('%Y-%m-%d'))
             return
         
-        print(f"\n{'='*70}")
-        print(f"Downloading data for: {date.strftime('%Y-%m-%d (%A)')}")
-        print(f"{'='*70}")
+        logger.info("\n%s", '=' * 70)
+        logger.info("Downloading data for: %s", date.strftime('%Y-%m-%d (%A)'))
+        logger.info("%s", '=' * 70)
         
-        # Download all data types
-        # self.download_fo_bhavcopy(date)
-        # self.download_fo_participant_oi(date)
-        # self.download_fo_participant_volume(date)
-        # self.download_fo_combined_oi(date)
-        # self.download_fii_statistics(date)
-
-        # self.download_equity_bhavcopy(date)
-        # self.download_cm_udiff_bhavcopy(date)
-        self.download_equity_deliverable(date)
-        # self.download_indices(date)
-        # self.download_vix(date)
-        
-        # Rate limiting
-        time.sleep(0.5)
+        for download in self.download_tasks():
+            download(date)
     
-    def download_date_range(self, start_date, end_date):
-        """Download data for a date range"""
-        current_date = start_date
-        
-        print(f"\n{'#'*70}")
-        print(f"NSE DATA DOWNLOADER")
-        print(f"{'#'*70}")
-        print(f"Date Range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-        print(f"Output Directory: {self.output_dir.absolute()}")
-        print(f"{'#'*70}")
-        
-        while current_date <= end_date:
-            self.download_all_for_date(current_date)
-            current_date += timedelta(days=1)
+    def download_tasks(self):
+        """Per-date download methods that are currently enabled"""
+        return [
+            # self.download_fo_bhavcopy,
+            # self.download_fo_participant_oi,
+            # self.download_fo_participant_volume,
+            # self.download_fo_combined_oi,
+            # self.download_fii_statistics,
+            
+            # self.download_equity_bhavcopy,
+            # self.download_cm_udiff_bhavcopy,
+            self.download_equity_deliverable,
+            # self.download_indices,
+            # self.download_vix,
+        ]
+    
+    def download_date_range(self, start_date, end_date, max_workers=8):
+        """Download data for a date range using a pool of worker threads"""
+        logger.info("\n%s", '#' * 70)
+        logger.info("NSE DATA DOWNLOADER")
+        logger.info("%s", '#' * 70)
+        logger.info("Date Range: %s to %s", start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        logger.info("Output Directory: %s", self.output_dir.absolute())
+        logger.info("%s", '#' * 70)
+        
+        # Trading days only, so weekends and holidays never reach the worker threads
+        dates = [date for date in pd.bdate_range(start_date, end_date).to_pydatetime()
+                 if self.is_trading_day(date)]
+        
+        # Every (file type, date) pair is its own job, so all file types of
+        # all dates overlap on the shared connection pool
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(download, date): (download.__name__, date)
+                for date in dates
+                for download in self.download_tasks()
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    name, date = futures[future]
+                    logger.error("  [-] Failed: %s %s - %s", name, date.strftime('%Y-%m-%d'), str(e)[:50])
         
         self.print_summary()
     
     def print_summary(self):
         """Print download summary statistics"""
-        print(f"\n{'='*70}")
-        print(f"DOWNLOAD SUMMARY")
-        print(f"{'='*70}")
-        print(f"Total Attempted:  {self.stats['total_attempted']}")
-        print(f"Successful:       {self.stats['successful']} ({self.stats['successful']/max(1, self.stats['total_attempted'])*100:.1f}%)")
-        print(f"Failed:           {self.stats['failed']}")
-        print(f"Skipped (Exists): {self.stats['skipped']}")
-        print(f"{'='*70}")
+        logger.info("\n%s", '=' * 70)
+        logger.info("DOWNLOAD SUMMARY")
+        logger.info("%s", '=' * 70)
+        logger.info("Total Attempted:  %d", self.stats['total_attempted'])
+        logger.info("Successful:       %d (%.1f%%)", self.stats['successful'],
+                    self.stats['successful'] / max(1, self.stats['total_attempted']) * 100)
+        logger.info("Failed:           %d", self.stats['failed'])
+        logger.info("Skipped (Exists): %d", self.stats['skipped'])
+        logger.info("%s", '=' * 70)
 
 
 def main():
@@ -0,0 +1,192 @@
+"""
+NSE CSV helpers
+Save downloaded CSV files to disk in a single streaming pass
+
+read_csv parses a CSV into a DataFrame with PyArrow's multithreaded reader
+when it is installed, falling back to pandas.
+
+Downloaded CSVs can also be mirrored into a year/month partitioned Parquet
+dataset (needs pyarrow) for fast full-year scans.
+
+open_zip_member inflates deflated zip members with ISA-L (the `isal`
+package) when it is installed, which is 2-4x faster than stdlib zlib.
+"""
+
+import io
+import os
+import struct
+import zipfile
+import zlib
+
+import pandas as pd
+
+from nse_http import get_logger
+
+try:
+    from isal import isal_zlib
+except ImportError:
+    isal_zlib = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pv = pq = None
+
+# Read/write buffer size used when streaming CSV data to disk
+CHUNK_SIZE = 64 * 1024
+
+logger = get_logger(__name__)
+
+
+# Fixed part of a zip local file header: signature ... extra field length
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+
+class _IsalZipMember(io.RawIOBase):
+    """
+    Raw stream of one deflated zip member, inflated by ISA-L; the CRC-32 is
+    checked at the end like zipfile does
+    """
+
+    def __init__(self, fp, info):
+        self._fp = fp
+        self._left = info.compress_size
+        self._expected_crc = info.CRC
+        self._crc = 0
+        self._inflater = isal_zlib.decompressobj(-zlib.MAX_WBITS)
+        self._pending = b''
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._done:
+            if self._left:
+                chunk = self._fp.read(min(CHUNK_SIZE, self._left))
+                if not chunk:
+                    raise zipfile.BadZipFile("Truncated zip member")
+                self._left -= len(chunk)
+                self._pending = self._inflater.decompress(chunk)
+            else:
+                self._pending = self._inflater.flush()
+                self._done = True
+            self._crc = zlib.crc32(self._pending, self._crc)
+        if self._done and not self._pending and self._crc != self._expected_crc:
+            raise zipfile.BadZipFile("Bad CRC-32 for zip member")
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def open_zip_member(zip_file, name):
+    """
+    Open member `name` of `zip_file` for reading, like zip_file.open(name)
+
+    Deflated members are inflated by ISA-L when `isal` is installed; other
+    members (or without isal) use zipfile's own reader. Only the caller's
+    stream changes, zipfile itself is not patched.
+    """
+    info = zip_file.getinfo(name)
+    if isal_zlib is None or info.compress_type != zipfile.ZIP_DEFLATED or info.flag_bits & 0x1:
+        return zip_file.open(info)
+
+    # Skip the member's local header to the start of its compressed data
+    fp = zip_file.fp
+    fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(fp.read(_LOCAL_HEADER.size))
+    if header[0] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"Bad local header for {name}")
+    fp.seek(header[-2] + header[-1], os.SEEK_CUR)
+    return io.BufferedReader(_IsalZipMember(fp, info), CHUNK_SIZE)
+
+
+def save_csv(source, output_file):
+    """
+    Stream CSV data from `source` (binary file object, e.g. a zip member or
+    BytesIO) to `output_file` without parsing it. The downloaded bhavcopies
+    are saved unchanged, so the rows only need to be counted, not rebuilt.
+
+    Returns:
+        Number of records written (excluding the header)
+    """
+    lines = 0
+    last = b'\n'
+    with open(output_file, 'wb') as dst:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+
+    # Count a final row that has no trailing newline
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def read_csv(source, column_types=None, null_values=None):
+    """
+    Parse CSV data from `source` (path or binary file object) into a DataFrame
+
+    Uses PyArrow's multithreaded parser with Arrow-backed columns when
+    available. Falls back to pandas if pyarrow is missing or rejects the file
+    (NSE files occasionally have malformed headers).
+
+    Args:
+        column_types: Optional {column: type alias} (e.g. 'int64', 'string')
+                      so pyarrow skips type inference for known columns
+        null_values: Optional strings to read as missing (e.g. '-')
+    """
+    if pv is not None:
+        convert_options = pv.ConvertOptions(
+            column_types={name: pa.type_for_alias(alias) for name, alias in (column_types or {}).items()},
+            **({'null_values': null_values} if null_values is not None else {}),
+        )
+        try:
+            table = pv.read_csv(
+                source,
+                read_options=pv.ReadOptions(use_threads=True, block_size=1 << 20),
+                parse_options=pv.ParseOptions(delimiter=','),
+                convert_options=convert_options,
+            )
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        except pa.lib.ArrowInvalid:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+    return pd.read_csv(source, na_values=null_values)
+
+
+def write_parquet(csv_path, dataset_root, date):
+    """
+    Mirror `csv_path` into the Parquet dataset under `dataset_root`, as
+    `year=YYYY/month=MM/<csv name>.parquet`. Re-downloads overwrite the same
+    file. The CSV is kept, since the sheet builders read the CSVs.
+
+    The mirror is best effort: if pyarrow cannot parse the CSV (e.g. a
+    title row or ragged rows) or the write fails, a warning is logged and
+    the already saved CSV is left as the download's result.
+
+    Returns:
+        Path of the Parquet file, or None if pyarrow is not installed or the
+        mirror failed
+    """
+    if pq is None:
+        return None
+
+    partition_dir = os.path.join(dataset_root, f"year={date.year}", f"month={date.month:02d}")
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    parquet_path = os.path.join(partition_dir, f"{stem}.parquet")
+
+    try:
+        os.makedirs(partition_dir, exist_ok=True)
+        pq.write_table(pv.read_csv(csv_path), parquet_path)
+    except (pa.ArrowInvalid, OSError) as e:
+        logger.warning("! Parquet mirror skipped for %s: %s", csv_path, e)
+        return None
+    return parquet_path
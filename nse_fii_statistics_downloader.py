@@ -4,12 +4,87 @@ Uses NSE's official API endpoints instead of direct file URLs
 This is more reliable as it's the same API the website uses
 """
 
-import requests
 import json
+import logging
 import urllib.parse
-from datetime import datetime, timedelta
+from datetime import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Tuple, Union
+
 import pandas as pd
-import io
+
+from nse_csv import CHUNK_SIZE, read_csv
+from nse_http import ACCEPT_ENCODING, POOL_SIZE, RateLimiter, get_logger, get_session, get_trading_holidays, has_cookies
+
+logger = get_logger(__name__)
+
+
+# Report configurations for the NSE reports API (read-only, shared by all calls)
+COMBINED_OI_REPORT = MappingProxyType({
+    "name": "F&O - Combine Open Interest across exchanges",
+    "type": "archives",
+    "category": "derivatives",
+    "section": "equity"
+})
+FII_STATISTICS_REPORT = MappingProxyType({
+    "name": "F&O - FII Derivatives Statistics",
+    "type": "archives",
+    "category": "derivatives",
+    "section": "equity"
+})
+
+# NSE writes '-' for an empty figure; reading it as missing keeps those
+# columns numeric instead of falling back to strings
+FII_NULL_VALUES = ['-', '']
+
+
+# Leading bytes of an HTML document (lower-cased, whitespace stripped)
+HTML_PREFIXES = (b'<!doctype', b'<html', b'<!--')
+
+
+def _looks_like_html(head: bytes) -> bool:
+    """True if `head` (the first bytes of a body) starts an HTML document"""
+    return head.lstrip()[:16].lower().startswith(HTML_PREFIXES)
+
+
+def _is_error_page(head: bytes) -> bool:
+    """
+    True if the first chunk of a body is an HTML page without a data table,
+    which NSE serves instead of a report on holidays and when rate limiting
+    """
+    return _looks_like_html(head) and b'<table' not in head.lower()
+
+
+@lru_cache(maxsize=16)
+def _encode_archives(name: str, type_: str, category: str, section: str) -> str:
+    """URL-encoded `archives` parameter for a report (only the date varies per call)"""
+    report_config = {"name": name, "type": type_, "category": category, "section": section}
+    return urllib.parse.quote(json.dumps([report_config]))
+
+
+# Accepted string date formats besides ISO (YYYY-MM-DD)
+DATE_INPUT_FORMATS = ("%d-%b-%Y", "%d%b%Y")
+
+
+def _coerce_date(date: Union[datetime, str]) -> datetime:
+    """Parse a date string (YYYY-MM-DD, DD-MMM-YYYY or DDMMMYYYY); datetimes pass through"""
+    if not isinstance(date, str):
+        return date
+    # fromisoformat is implemented in C, so try it before the slower strptime
+    try:
+        return datetime.fromisoformat(date)
+    except ValueError:
+        pass
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(date, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {date!r}")
+
 
 class NSEAPIDownloader:
     """
@@ -17,47 +92,103 @@ class NSEAPIDownloader:
     This is the same API that NSE's website uses
     """
     
-    def __init__(self):
+    # Sent per request, since the session is shared with other downloaders.
+    # Built once at class definition; instances share it read-only.
+    HEADERS = MappingProxyType({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': ACCEPT_ENCODING,
+        'Connection': 'keep-alive',
+        'Referer': 'https://www.nseindia.com/all-reports-derivatives',
+        'X-Requested-With': 'XMLHttpRequest'
+    })
+    
+    def __init__(self) -> None:
         self.base_url = "https://www.nseindia.com"
-        self.session = requests.Session()
+        # Pooled session (with retry/backoff) shared by all NSE downloaders
+        self.session = get_session()
+        # Shared by all worker threads to stay under NSE's request throttle
+        self.rate_limiter = RateLimiter(calls=5, per=1)
+        # Created once here rather than on every download
+        self.fii_output_dir = os.path.abspath("./NSE_Downloads/FII_Statistics")
+        os.makedirs(self.fii_output_dir, exist_ok=True)
         self._setup_session()
     
-    def _setup_session(self):
+    def _setup_session(self) -> None:
         """Setup session with proper headers for NSE API"""
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            # 'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Referer': 'https://www.nseindia.com/all-reports-derivatives',
-            'X-Requested-With': 'XMLHttpRequest'
-        })
+        self.headers = self.HEADERS
         
-        # Get cookies by visiting the page first
+        # Cookies saved by an earlier run are reused; only warm up without them
+        if has_cookies(self.session):
+            logger.debug("✓ Reusing saved NSE session cookies")
+        else:
+            self._init_cookies()
+    
+    def _init_cookies(self) -> None:
+        """Get cookies by visiting the reports page"""
         try:
-            response = self.session.get(
+            self.session.get(
                 f"{self.base_url}/all-reports-derivatives",
+                headers=self.headers,
                 timeout=10
             )
-            print("✓ Session initialized with cookies")
+            logger.info("✓ Session initialized with cookies")
         except Exception as e:
-            print(f"! Warning during session init: {e}")
+            logger.warning("! Warning during session init: %s", e)
+    
+    def _get(self, url: str, **kwargs):
+        """Rate-limited GET on the shared session"""
+        self.rate_limiter.wait()
+        response = self.session.get(url, headers=self.headers, **kwargs)
+        
+        # Cookies expired - warm the session up again and retry once
+        if response.status_code in (401, 403):
+            response.close()
+            self._init_cookies()
+            self.rate_limiter.wait()
+            response = self.session.get(url, headers=self.headers, **kwargs)
+        return response
     
-    def _build_api_url(self, report_config, date_str):
+    def _parse_file(self, path: str, **csv_kwargs) -> pd.DataFrame:
+        """
+        Parse a downloaded report based on its leading bytes
+        
+        NSE serves some ".xls" reports as real Excel files or HTML tables, so
+        sniffing the format avoids a failed CSV parse of the whole file.
+        `csv_kwargs` are passed to read_csv for plain CSV content.
+        """
+        with open(path, 'rb') as f:
+            head = f.read(8)
+        
+        if head.startswith(b'\xd0\xcf\x11\xe0'):
+            # OLE2 compound document: legacy .xls
+            return pd.read_excel(path, engine='xlrd')
+        if head.startswith(b'PK\x03\x04'):
+            # Zip container: .xlsx
+            return pd.read_excel(path, engine='openpyxl')
+        if _looks_like_html(head) or head.lstrip().lower().startswith(b'<table'):
+            return pd.read_html(path)[0]
+        return read_csv(path, **csv_kwargs)
+    
+    def _build_api_url(self, report_config: Mapping[str, str], date_str: str) -> str:
         """
         Build NSE API URL with proper encoding
         
         Args:
-            report_config: Dict with report configuration
+            report_config: Mapping with report configuration
             date_str: Date in DD-MMM-YYYY format (e.g., '24-Nov-2025')
         
         Returns:
             Complete API URL
         """
-        # Convert report config to JSON and encode
-        archives_json = json.dumps([report_config])
-        archives_encoded = urllib.parse.quote(archives_json)
+        # Convert report config to JSON and encode (cached per report)
+        archives_encoded = _encode_archives(
+            report_config['name'],
+            report_config['type'],
+            report_config['category'],
+            report_config['section'],
+        )
         
         # Build full URL
         url = (
@@ -70,7 +201,9 @@ class NSEAPIDownloader:
         
         return url
     
-    def download_combined_oi(self, date, output_file=None):
+    def download_combined_oi(
+        self, date: Union[datetime, str], output_file: Optional[str] = None
+    ) -> Union[pd.DataFrame, str, None]:
         """
         Download Combined Open Interest using NSE API
         
@@ -79,341 +212,170 @@ class NSEAPIDownloader:
             output_file: Optional output filename
         
         Returns:
-            DataFrame or raw data
+            pandas DataFrame with combined OI data
         """
         # Format date
-        if isinstance(date, str):
-            try:
-                if '-' in date:
-                    dt = datetime.strptime(date, "%d-%b-%Y")
-                else:
-                    dt = datetime.strptime(date, "%d%b%Y")
-            except:
-                dt = datetime.strptime(date, "%Y-%m-%d")
-        else:
-            dt = date
+        dt = _coerce_date(date)
         
         # NSE API expects DD-MMM-YYYY format
         date_str = dt.strftime("%d-%b-%Y")
         
-        print(f"\n{'='*70}")
-        print(f"Downloading Combined OI via NSE API")
-        print(f"Date: {date_str}")
-        print(f"{'='*70}\n")
-        
-        # Report configuration
-        report_config = {
-            "name": "F&O - Combine Open Interest across exchanges",
-            "type": "archives",
-            "category": "derivatives",
-            "section": "equity"
-        }
+        logger.info("Downloading Combined OI via NSE API for %s", date_str)
         
         # Build API URL
-        api_url = self._build_api_url(report_config, date_str)
+        api_url = self._build_api_url(COMBINED_OI_REPORT, date_str)
         
-        print(f"API URL (decoded):")
-        print(f"  {urllib.parse.unquote(api_url)}\n")
+        logger.debug("API URL: %s", api_url)
         
         try:
-            print(f"Making API request...")
-            response = self.session.get(api_url, timeout=20)
-            
-            print(f"Response status: {response.status_code}")
+            response = self._get(api_url, timeout=20, stream=True)
             
-            if response.status_code == 200:
-                # Check content type
-                content_type = response.headers.get('Content-Type', '')
-                print(f"Content-Type: {content_type}")
-                
-                # NSE API might return JSON with download link or direct CSV
-                if 'application/json' in content_type:
-                    # JSON response - parse it
-                    data = response.json()
-                    print(f"\nAPI Response (JSON):")
-                    print(json.dumps(data, indent=2)[:500] + "...")
-                    
-                    # Look for download URL in response
-                    if isinstance(data, dict) and 'path' in data:
-                        download_url = data['path']
-                        print(f"\nFound download URL: {download_url}")
-                        
-                        # Download the actual file
-                        file_response = self.session.get(
-                            f"{self.base_url}{download_url}",
-                            timeout=20
-                        )
-                        
-                        if file_response.status_code == 200:
-                            content = file_response.content
-                        else:
-                            print(f"✗ Failed to download file: {file_response.status_code}")
-                            return None
-                    else:
-                        print("✗ Unexpected JSON response format")
-                        return None
+            with response:
+                logger.debug("Response Status: %s", response.status_code)
+                logger.debug("Content-Type: %s", response.headers.get('Content-Type', 'Unknown'))
+                logger.debug("Content-Length: %s bytes", response.headers.get('Content-Length', 'Unknown'))
                 
-                elif 'text/csv' in content_type or 'application/csv' in content_type:
-                    # Direct CSV response
-                    content = response.content
-                    print(f"✓ Received CSV directly")
+                if response.status_code != 200:
+                    logger.error("✗ Failed with status code: %s", response.status_code)
+                    if logger.isEnabledFor(logging.DEBUG) and response.text:
+                        logger.debug("Response: %s", response.text[:200])
+                    return None
                 
-                else:
-                    # Unknown content type, try to parse anyway
-                    content = response.content
-                    print(f"! Unknown content type, attempting to parse...")
-                
-                # Save to file if specified
+                # Determine output filename
                 if output_file is None:
                     output_file = f"combined_oi_{dt.strftime('%d%b%Y').upper()}.csv"
                 
-                with open(output_file, 'wb') as f:
-                    f.write(content)
-                
-                print(f"\n✓ Saved to: {output_file}")
-                print(f"  File size: {len(content):,} bytes")
+                chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+                first_chunk = next(chunks, b'')
                 
-                # Try to parse as DataFrame
-                try:
-                    df = pd.read_csv(io.BytesIO(content))
-                    print(f"  Data shape: {df.shape}")
-                    print(f"\nFirst few rows:")
-                    print(df.head())
-                    return df
-                except Exception as e:
-                    print(f"! Could not parse as CSV: {e}")
-                    print(f"  Saved raw content to {output_file}")
-                    return content
+                # Bail out on an HTML error page before saving or parsing it
+                if _is_error_page(first_chunk):
+                    logger.error("✗ NSE returned an HTML page instead of the report")
+                    return None
                 
-            else:
-                print(f"\n✗ API request failed: {response.status_code}")
-                print(f"Response: {response.text[:200]}")
-                return None
-                
-        except Exception as e:
-            print(f"\n✗ Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
-    
-    def download_combined_oi(self, date, output_file=None):
-        """
-        Download Combined Open Interest using NSE API
-        
-        Args:
-            date: datetime object or date string
-            output_file: Optional output filename
-        
-        Returns:
-            pandas DataFrame with combined OI data
-        """
-        # Format date
-        if isinstance(date, str):
-            try:
-                if '-' in date:
-                    dt = datetime.strptime(date, "%d-%b-%Y")
-                else:
-                    dt = datetime.strptime(date, "%d%b%Y")
-            except:
-                dt = datetime.strptime(date, "%Y-%m-%d")
-        else:
-            dt = date
-        
-        # NSE API expects DD-MMM-YYYY format
-        date_str = dt.strftime("%d-%b-%Y")
-        
-        print(f"\n{'='*70}")
-        print(f"Downloading Combined OI via NSE API")
-        print(f"Date: {date_str}")
-        print(f"{'='*70}\n")
-        
-        # Report configuration
-        report_config = {
-            "name": "F&O - Combine Open Interest across exchanges",
-            "type": "archives",
-            "category": "derivatives",
-            "section": "equity"
-        }
-        
-        # Build API URL
-        api_url = self._build_api_url(report_config, date_str)
-        
-        print(f"API URL: {api_url}\n")
-        print(f"Making API request...")
-        
-        try:
-            response = self.session.get(api_url, timeout=20)
+                # Stream to file instead of holding the body in memory
+                with open(output_file, 'wb') as f:
+                    f.write(first_chunk)
+                    for chunk in chunks:
+                        f.write(chunk)
             
-            print(f"Response Status: {response.status_code}")
-            print(f"Content-Type: {response.headers.get('Content-Type', 'Unknown')}")
-            print(f"Content-Length: {len(response.content):,} bytes")
+            logger.info("✓ Saved to: %s", output_file)
             
-            if response.status_code == 200:
-                content = response.content
-                
-                # Determine output filename
-                if output_file is None:
-                    output_file = f"combined_oi_{dt.strftime('%d%b%Y').upper()}.csv"
+            # Try to parse as DataFrame
+            try:
+                df = self._parse_file(output_file)
+                logger.debug("✓ Data shape: %s", df.shape)
+                logger.debug("✓ Columns: %s...", list(df.columns[:5]))
                 
-                # Save to file
-                with open(output_file, 'wb') as f:
-                    f.write(content)
+                # Show first few rows (rendering the table is only worth it at DEBUG)
+                if len(df) > 0 and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("📊 First 3 rows:\n%s", df.head(3).to_string(index=False, max_cols=8))
                 
-                print(f"\n✓ Saved to: {output_file}")
+                return df
                 
-                # Try to parse as DataFrame
-                try:
-                    df = pd.read_csv(io.BytesIO(content))
-                    print(f"✓ Data shape: {df.shape}")
-                    print(f"✓ Columns: {list(df.columns[:5])}...")
-                    
-                    # Show first few rows
-                    if len(df) > 0:
-                        print(f"\n📊 First 3 rows:")
-                        print(df.head(3).to_string(index=False, max_cols=8))
-                    
-                    return df
-                    
-                except Exception as e:
-                    print(f"! Could not parse as DataFrame: {e}")
-                    print(f"! Raw content saved to {output_file}")
-                    return content
-                
-            else:
-                print(f"\n✗ Failed with status code: {response.status_code}")
-                if response.text:
-                    print(f"Response: {response.text[:200]}")
-                return None
+            except Exception as e:
+                logger.warning("! Could not parse as DataFrame: %s", e)
+                logger.warning("! Raw content saved to %s", output_file)
+                return output_file
                 
         except Exception as e:
-            print(f"\n✗ Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("✗ Error: %s", e)
             return None
     
-    def download_fii_statistics(self, date, output_file=None):
+    def download_fii_statistics(
+        self, date: Union[datetime, str], output_file: Optional[str] = None, parse: bool = False
+    ) -> Union[pd.DataFrame, str, None]:
         """
         Download Participant-wise OI using NSE API
         
         Args:
             date: datetime object or date string
             output_file: Optional output filename
+            parse: Opt-in: parse the saved file and return the DataFrame
+                   instead of the path
         
         Returns:
-            pandas DataFrame with participant OI data
+            Path of the saved file (as before), or a pandas DataFrame when
+            parse=True and the file could be parsed
         """
-        if isinstance(date, str):
-            try:
-                if '-' in date:
-                    dt = datetime.strptime(date, "%d-%b-%Y")
-                else:
-                    dt = datetime.strptime(date, "%d%b%Y")
-            except:
-                dt = datetime.strptime(date, "%Y-%m-%d")
-        else:
-            dt = date
+        dt = _coerce_date(date)
         
         date_str = dt.strftime("%d-%b-%Y")
         
-        print(f"\n{'='*70}")
-        print(f"Downloading Participant OI via NSE API")
-        print(f"Date: {date_str}")
-        print(f"{'='*70}\n")
+        logger.info("Downloading Participant OI via NSE API for %s", date_str)
         
-        report_config = {
-            "name": "F&O - FII Derivatives Statistics",
-            "type": "archives",
-            "category": "derivatives",
-            "section": "equity"
-        }
+        api_url = self._build_api_url(FII_STATISTICS_REPORT, date_str)
         
-        api_url = self._build_api_url(report_config, date_str)
-        
-        print(f"API URL: {api_url}\n")
-        print(f"Making API request...")
+        logger.debug("API URL: %s", api_url)
         
         try:
-            response = self.session.get(api_url, timeout=20)
-            
-            print(f"Response Status: {response.status_code}")
-            print(f"Content-Type: {response.headers.get('Content-Type', 'Unknown')}")
-            print(f"Content-Length: {len(response.content):,} bytes")
+            response = self._get(api_url, timeout=20, stream=True)
             
-            if response.status_code == 200:
-                content = response.content
+            with response:
+                logger.debug("Response Status: %s", response.status_code)
+                logger.debug("Content-Type: %s", response.headers.get('Content-Type', 'Unknown'))
+                logger.debug("Content-Length: %s bytes", response.headers.get('Content-Length', 'Unknown'))
+                
+                if response.status_code != 200:
+                    logger.error("✗ Failed with status code: %s", response.status_code)
+                    if logger.isEnabledFor(logging.DEBUG) and response.text:
+                        logger.debug("Response: %s", response.text[:200])
+                    return None
                 
                 # Determine output filename
                 if output_file is None:
                     output_file = f"fii_statistics_{dt.strftime('%Y%m%d').upper()}.xls"
-                output_dir = "./NSE_Downloads/FII_Statistics"
-                import os
-                os.makedirs(output_dir, exist_ok=True)
-                filepath = os.path.join(output_dir, output_file)
-                # Save to file
-                with open(filepath, 'wb') as f:
-                    # print(
-                    #     content
-                    # )
-                    f.write(content)
+                filepath = os.path.join(self.fii_output_dir, output_file)
+                chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+                first_chunk = next(chunks, b'')
                 
-                print(f"\n✓ Saved to: {output_file}, {filepath}")
+                # Bail out on an HTML error page before saving or parsing it
+                if _is_error_page(first_chunk):
+                    logger.error("✗ NSE returned an HTML page instead of the report")
+                    return None
                 
-                # Parse as DataFrame
+                # Stream to a .part file instead of holding the body in memory,
+                # and move it into place only once the whole body is written
+                part_path = filepath + '.part'
                 try:
-                    df = pd.read_csv(io.BytesIO(content))
-                    # print(f"✓ Data shape: {df.shape}")
-                    # print(f"✓ Columns: {list(df.columns[:5])}...")
-                    
-                    # Show participant summary
-                    if len(df) > 0:
-                        # print(f"\n📊 Participant Summary:")
-                        for idx in range(min(4, len(df))):
-                            row = df.iloc[idx]
-                            participant = row.iloc[0] if len(row) > 0 else 'Unknown'
-                            total_long = row.iloc[-2] if len(row) > 1 else 'N/A'
-                            total_short = row.iloc[-1] if len(row) > 1 else 'N/A'
-                            # print(f"  {participant}: Long={total_long}, Short={total_short}")
-                    
-                    # return df
-                    return filepath
-                    
-                except Exception as e:
-                    print(f"! Could not parse as DataFrame: {e}")
-                    print(f"! Raw content saved to {output_file}")
-                    # return content
-                    return filepath
-                    
-            else:
-                print(f"\n✗ Failed with status code: {response.status_code}")
-                if response.text:
-                    print(f"Response: {response.text[:200]}")
-                return None
+                    with open(part_path, 'wb') as f:
+                        f.write(first_chunk)
+                        for chunk in chunks:
+                            f.write(chunk)
+                    os.replace(part_path, filepath)
+                except Exception:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    raise
+            
+            logger.info("✓ Saved to: %s", filepath)
+            
+            if not parse:
+                return filepath
+            
+            # Parse as DataFrame (from disk, the body is no longer in memory)
+            try:
+                return self._parse_file(filepath, null_values=FII_NULL_VALUES)
+            except Exception as e:
+                logger.warning("! Could not parse as DataFrame: %s", e)
+                logger.warning("! Raw content saved to %s", output_file)
+                return filepath
                 
         except Exception as e:
-            print(f"\n✗ Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("✗ Error: %s", e)
             return None
     
-    def list_available_reports(self, category="derivatives", section="equity"):
+    def list_available_reports(self, category: str = "derivatives", section: str = "equity") -> List[Mapping[str, str]]:
         """
         List all available reports for a category
         
         This is useful to discover what reports are available
         """
-        print(f"\n{'='*70}")
-        print(f"Available NSE Reports")
-        print(f"Category: {category}, Section: {section}")
-        print(f"{'='*70}\n")
+        logger.info("Available NSE Reports (category: %s, section: %s)", category, section)
         
         # Common F&O reports
         fo_reports = [
-            {
-                "name": "F&O - Combine Open Interest across exchanges",
-                "type": "archives",
-                "category": "derivatives",
-                "section": "equity"
-            },
+            COMBINED_OI_REPORT,
             {
                 "name": "F&O - Participant wise Open Interest(csv)",
                 "type": "archives",
@@ -441,36 +403,54 @@ class NSEAPIDownloader:
         ]
         
         for i, report in enumerate(fo_reports, 1):
-            print(f"{i}. {report['name']}")
+            logger.info("%d. %s", i, report['name'])
         
         return fo_reports
     
-    def download_date_range(self, start_date, end_date, output_dir="./nse_data"):
-        """Download Combined OI for a date range"""
-        current = start_date
+    def download_date_range(
+        self, start_date: datetime, end_date: datetime, output_dir: str = "./nse_data", max_workers: int = 8
+    ) -> Tuple[List[str], List[str]]:
+        """Download FII Statistics for a date range using a pool of worker threads"""
         successful = []
         failed = []
+        results = {}
         
-        while current <= end_date:
-            # Skip weekends (Saturday=5, Sunday=6)
-            if current.weekday() < 5:  
-                result = current
-                print(current)
-                self.download_participant_oi(current.strftime("%d-%b-%Y"))
-                if result:
-                    successful.append(current.strftime("%d-%b-%Y"))
-                else:
-                    failed.append(current.strftime("%d-%b-%Y"))
-            
-            current += timedelta(days=1)
+        # Trading days only: custom business days skip weekends and NSE holidays
+        days = pd.bdate_range(start_date, end_date, freq='C', holidays=sorted(get_trading_holidays()))
+        dates = days.to_pydatetime().tolist()
+        
+        # Format each date once; used in the log lines and the summary
+        labels = dict(zip(dates, days.strftime("%d-%b-%Y")))
+        
+        # More workers than pooled connections would just open and discard sockets
+        with ThreadPoolExecutor(max_workers=min(max_workers, POOL_SIZE)) as executor:
+            # Only the saved paths are needed here, so skip DataFrame parsing
+            futures = {
+                executor.submit(self.download_fii_statistics, date, parse=False): date
+                for date in dates
+            }
+            for future in as_completed(futures):
+                date = futures[future]
+                try:
+                    results[date] = future.result()
+                except Exception as e:
+                    logger.error("✗ Failed to download %s: %s", labels[date], e)
+                    results[date] = None
+        
+        # Report in date order regardless of completion order
+        for date in dates:
+            if results.get(date):
+                successful.append(labels[date])
+            else:
+                failed.append(labels[date])
         
-        print(f"\n{'='*50}")
-        print(f"Download Summary:")
-        print(f"  Successful: {len(successful)}")
-        print(f"  Failed: {len(failed)}")
+        logger.info("\n%s", '=' * 50)
+        logger.info("Download Summary:")
+        logger.info("  Successful: %d", len(successful))
+        logger.info("  Failed: %d", len(failed))
         if failed:
-            print(f"  Failed dates: {', '.join(failed)}")
-        print(f"{'='*50}\n")
+            logger.info("  Failed dates: %s", ', '.join(failed))
+        logger.info("%s\n", '=' * 50)
         # log_filepath = "log_participant_oi.log"
         # with open(log_filepath, 'w') as f:
         #     f.write(f"Successful: {successful},\nFailed: {failed}")
@@ -0,0 +1,256 @@
+"""
+NSE HTTP helpers
+Shared helpers used by the NSE downloaders when running requests concurrently
+"""
+
+import atexit
+import http.cookiejar
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+
+# Content encodings the installed urllib3 can decode: always gzip/deflate, plus
+# br/zstd when the brotli/zstandard packages are installed
+ACCEPT_ENCODING = DEFAULT_ACCEPT_ENCODING
+
+# Connection pool size per host, sized for the download thread pools
+POOL_SIZE = 32
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+_LOG_LISTENER = None
+_LOG_LOCK = threading.Lock()
+_FILE_LOGGERS = {}
+
+_ENSURED_DIRS = set()
+_DIRS_LOCK = threading.Lock()
+
+# NSE trading holiday calendar, cached on disk for HOLIDAY_CACHE_TTL seconds
+HOLIDAY_URL = "https://www.nseindia.com/api/holiday-master?type=trading"
+HOLIDAY_CACHE_FILE = "nse_holidays.json"
+HOLIDAY_CACHE_TTL = 30 * 24 * 3600
+HOLIDAY_SEGMENTS = ('CM', 'FO')
+
+# NSE session cookies, persisted so a new process can skip the warm-up GET
+COOKIE_CACHE_FILE = "nse_cookies.txt"
+
+
+def get_session():
+    """
+    Return the process-wide requests.Session shared by all NSE downloaders
+    
+    Reusing one session keeps TCP/TLS connections and NSE cookies alive
+    across downloader instances instead of paying the handshake per date.
+    Headers are passed per request so downloaders do not clobber each other.
+    
+    Unexpired cookies saved by a previous run are loaded, and the jar is
+    saved again at exit.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE,
+                pool_maxsize=POOL_SIZE,
+                max_retries=retry,
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            
+            jar = http.cookiejar.LWPCookieJar(COOKIE_CACHE_FILE)
+            if os.path.exists(COOKIE_CACHE_FILE):
+                try:
+                    jar.load(ignore_discard=True)
+                except (OSError, http.cookiejar.LoadError):
+                    jar.clear()
+            session.cookies.update(jar)
+            atexit.register(save_cookies, session)
+            _SESSION = session
+        return _SESSION
+
+
+def save_cookies(session, cache_file=COOKIE_CACHE_FILE):
+    """Persist the session's unexpired cookies to `cache_file`"""
+    jar = http.cookiejar.LWPCookieJar(cache_file)
+    for cookie in session.cookies:
+        if not cookie.is_expired():
+            jar.set_cookie(cookie)
+    try:
+        jar.save(ignore_discard=True)
+    except OSError:
+        pass
+
+
+def has_cookies(session, domain='nseindia.com'):
+    """True if the session holds an unexpired cookie for `domain`"""
+    return any(
+        cookie.domain.endswith(domain) and not cookie.is_expired()
+        for cookie in session.cookies
+    )
+
+
+def get_logger(name):
+    """
+    Return the `nse.<name>` logger
+    
+    All `nse.*` loggers feed one QueueHandler; a single background
+    QueueListener writes the records to stdout, so worker threads never
+    block on the console.
+    """
+    global _LOG_LISTENER
+    with _LOG_LOCK:
+        if _LOG_LISTENER is None:
+            log_queue = queue.SimpleQueue()
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _LOG_LISTENER = QueueListener(log_queue, handler)
+            _LOG_LISTENER.start()
+            atexit.register(_LOG_LISTENER.stop)
+            
+            nse_logger = logging.getLogger('nse')
+            nse_logger.addHandler(QueueHandler(log_queue))
+            nse_logger.setLevel(logging.INFO)
+            nse_logger.propagate = False
+    return logging.getLogger(f'nse.{name}')
+
+
+def get_file_logger(name, filename):
+    """
+    Return a logger that appends plain messages to `filename`
+    
+    Like get_logger, records go through a queue and a background listener
+    does the file I/O, so worker threads do not contend on the file.
+    """
+    with _LOG_LOCK:
+        logger = _FILE_LOGGERS.get(name)
+        if logger is None:
+            log_queue = queue.SimpleQueue()
+            handler = logging.FileHandler(filename)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            listener = QueueListener(log_queue, handler)
+            listener.start()
+            atexit.register(listener.stop)
+            
+            logger = logging.getLogger(f'nse_file.{name}')
+            logger.addHandler(QueueHandler(log_queue))
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            _FILE_LOGGERS[name] = logger
+    return logger
+
+
+def ensure_dir(path):
+    """
+    os.makedirs(path, exist_ok=True), done once per directory per process
+    
+    Later calls for the same path return without touching the filesystem.
+    """
+    if path in _ENSURED_DIRS:
+        return
+    with _DIRS_LOCK:
+        if path not in _ENSURED_DIRS:
+            os.makedirs(path, exist_ok=True)
+            _ENSURED_DIRS.add(path)
+
+
+def get_trading_holidays(cache_file=HOLIDAY_CACHE_FILE):
+    """
+    Return the set of NSE trading holidays (datetime.date)
+    
+    The list comes from NSE's holiday-master API and is cached on disk for
+    30 days. If it cannot be fetched, a stale cache or an empty set is
+    returned, so callers fall back to skipping weekends only.
+    """
+    logger = get_logger('holidays')
+    cached = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file) as f:
+                cached = {datetime.strptime(d, '%Y-%m-%d').date() for d in json.load(f)}
+            if time.time() - os.path.getmtime(cache_file) < HOLIDAY_CACHE_TTL:
+                return cached
+        except (OSError, ValueError):
+            cached = None
+    
+    try:
+        response = get_session().get(
+            HOLIDAY_URL,
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'application/json, text/plain, */*',
+                'Referer': 'https://www.nseindia.com/resources/exchange-communication-holidays',
+            },
+            timeout=10,
+        )
+        response.raise_for_status()
+        data = response.json()
+        holidays = {
+            datetime.strptime(item['tradingDate'], '%d-%b-%Y').date()
+            for segment in HOLIDAY_SEGMENTS
+            for item in data.get(segment, [])
+        }
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        logger.warning("! Could not fetch NSE holiday list: %s", e)
+        return cached or set()
+    
+    with open(cache_file, 'w') as f:
+        json.dump(sorted(d.isoformat() for d in holidays), f)
+    return holidays
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `calls` requests per `per` seconds (thread safe)
+    
+    Tokens refill continuously, so a slow request does not waste its slot and
+    up to `calls` requests may go out back-to-back after an idle period.
+    """
+
+    def __init__(self, calls=5, per=1.0):
+        self.capacity = calls
+        self.rate = calls / per
+        self._tokens = float(calls)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def __enter__(self):
+        self.wait()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
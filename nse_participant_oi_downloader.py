@@ -10,6 +10,8 @@ import urllib.parse
 from datetime import datetime, timedelta
 import pandas as pd
 import io
+import os
+import traceback
 
 class NSEAPIDownloader:
     """
@@ -192,7 +194,6 @@ class NSEAPIDownloader:
                 
         except Exception as e:
             print(f"\n✗ Error: {str(e)}")
-            import traceback
             traceback.print_exc()
             return None
     
@@ -287,7 +288,6 @@ class NSEAPIDownloader:
                 
         except Exception as e:
             print(f"\n✗ Error: {str(e)}")
-            import traceback
             traceback.print_exc()
             return None
     
@@ -346,7 +346,6 @@ class NSEAPIDownloader:
                 if output_file is None:
                     output_file = f"participant_oi_{dt.strftime('%Y%m%d').upper()}.csv"
                 output_dir = "./NSE_Downloads/FO_Participant_OI"
-                import os
                 os.makedirs(output_dir, exist_ok=True)
                 filepath = os.path.join(output_dir, output_file)
                 # Save to file
@@ -391,7 +390,6 @@ class NSEAPIDownloader:
                 
         except Exception as e:
             print(f"\n✗ Error: {str(e)}")
-            import traceback
             traceback.print_exc()
             return None
     
@@ -3,30 +3,228 @@ NSE Official API Downloader - FIXED VERSION
 Issues identified and corrected
 """
 
-import requests
 import json
+import logging
 import urllib.parse
 from datetime import datetime, timedelta
-import pandas as pd
 import io
 import os
-import gzip
 import zlib
 import lzma
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import nse_csv
+from nse_http import POOL_SIZE, RateLimiter, ensure_dir, get_file_logger, get_logger, get_session, get_trading_holidays, has_cookies
+
+# ISA-L inflate (2-4x faster than stdlib zlib) when the `isal` package is installed
+try:
+    from isal import isal_zlib as _inflate
+except ImportError:
+    _inflate = zlib
+
+
+logger = get_logger(__name__)
+
+# Per-date results log, opened (with its background writer) by the first downloader
+RESULT_LOG_FILE = "log_participant_tv.log"
+
+BASE_URL = "https://www.nseindia.com"
+
+PARTICIPANT_TV_REPORT = {
+    "name": "F&O - Participant wise Trading Volumes(csv)",
+    "type": "archives",
+    "category": "derivatives",
+    "section": "equity"
+}
+
+# API URL template, filled per date with str.format; only the date varies, so
+# the report config is JSON- and URL-encoded once at import
+PARTICIPANT_TV_URL = (
+    f"{BASE_URL}/api/reports"
+    f"?archives={urllib.parse.quote(json.dumps([PARTICIPANT_TV_REPORT]))}"
+    "&date={date_str}"
+    f"&type={PARTICIPANT_TV_REPORT['section']}"
+    "&mode=single"
+)
+
+# Read size when streaming a response body (matches gzip's READ_BUFFER_SIZE)
+READ_BUFFER_SIZE = 128 * 1024
+
+
+# (magic prefix, name, incremental decompressor factory), checked in order.
+# Zip needs random access to its central directory, so it has no factory.
+_MAGIC_DECOMPRESSORS = (
+    (b'\x1f\x8b', 'GZIP', lambda: _inflate.decompressobj(16 + zlib.MAX_WBITS)),
+    (b'\xfd7zXZ\x00', 'LZMA', lzma.LZMADecompressor),
+    (b'\x5d\x00\x00', 'LZMA', lambda: lzma.LZMADecompressor(format=lzma.FORMAT_ALONE)),
+    (b'PK\x03\x04', 'ZIP', None),
+    (b'\x78\x01', 'ZLIB', _inflate.decompressobj),
+    (b'\x78\x5e', 'ZLIB', _inflate.decompressobj),
+    (b'\x78\x9c', 'ZLIB', _inflate.decompressobj),
+    (b'\x78\xda', 'ZLIB', _inflate.decompressobj),
+)
+
+# Headerless deflate stream, tried last when no magic matches
+_RAW_DEFLATE = ('DEFLATE', lambda: _inflate.decompressobj(-zlib.MAX_WBITS))
+
+# Bytes expected at the start of a plain CSV body
+_CSV_TEXT_BYTES = bytes(range(0x20, 0x7f)) + b'\t\r\n'
+
+# Content-Type prefixes NSE uses for plain CSV payloads
+_TEXT_CONTENT_TYPES = ('text/csv', 'application/csv', 'text/plain')
+
+# Offsets at which a wrapped payload has been seen to start after a short header
+_HEADER_SKIP_BYTES = (4, 8, 12, 16)
+
+
+def _match_magic(head):
+    """Return the (name, factory) pair whose magic starts `head`, or None"""
+    for magic, name, factory in _MAGIC_DECOMPRESSORS:
+        if head.startswith(magic):
+            return name, factory
+    return None
+
+
+def _is_raw_deflate(head):
+    """True if `head` is not CSV text and starts a valid raw deflate stream"""
+    if head.startswith(b'\xef\xbb\xbf'):
+        head = head[3:]
+    if not head or not head.translate(None, _CSV_TEXT_BYTES):
+        return False
+    try:
+        zlib.decompressobj(-zlib.MAX_WBITS).decompress(head)
+    except zlib.error:
+        return False
+    return True
+
+
+def _detect_compression(head, scan_offsets=True):
+    """
+    Detect the compression of a body from its first bytes
+    
+    With scan_offsets=False only a magic at the very start is recognised;
+    used when the response headers already say the body is plain text.
+    
+    Returns:
+        (codec name, decompressor factory, bytes to skip) - codec is None for
+        a body with no known compression header
+    """
+    match = _match_magic(head)
+    if match is not None:
+        return match + (0,)
+    if not scan_offsets:
+        return None, None, 0
+    
+    # Payload wrapped behind a short header: only offsets where a magic matches
+    for skip_bytes in _HEADER_SKIP_BYTES:
+        match = _match_magic(head[skip_bytes:skip_bytes + 6])
+        if match is not None:
+            return match + (skip_bytes,)
+    
+    # Last resort, as before the streaming rewrite: a binary body that inflates as raw deflate
+    if _is_raw_deflate(head):
+        return _RAW_DEFLATE + (0,)
+    
+    return None, None, 0
+
+
+def _date_format(date_str):
+    """strptime format for YYYY-MM-DD, DD-MMM-YYYY or DDMMMYYYY, picked from the string's shape"""
+    if date_str[4:5] == '-':
+        return "%Y-%m-%d"
+    return "%d-%b-%Y" if '-' in date_str else "%d%b%Y"
+
+
+class _CsvTee:
+    """
+    File wrapper that counts lines and keeps the first bytes of what is
+    written, so a CSV can be checked in the same pass that saves it
+    """
+    
+    HEAD_SIZE = 4096
+    
+    def __init__(self, dst):
+        self.dst = dst
+        self.lines = 0
+        self.head = b''
+        self.last = b'\n'
+    
+    def write(self, data):
+        if not data:
+            return 0
+        if len(self.head) < self.HEAD_SIZE:
+            self.head += data[:self.HEAD_SIZE - len(self.head)]
+        self.lines += data.count(b'\n')
+        self.last = data[-1:]
+        return self.dst.write(data)
+    
+    @property
+    def rows(self):
+        """Records written, excluding the header (a final unterminated row counts)"""
+        lines = self.lines + (self.last != b'\n')
+        return max(lines - 1, 0)
+    
+    @property
+    def columns(self):
+        """Header fields, or an empty list if the content does not look like text CSV"""
+        if not self.head or b'\x00' in self.head:
+            return []
+        header = self.head.split(b'\n', 1)[0].decode('utf-8', errors='ignore').strip()
+        return [name.strip() for name in header.split(',')] if header else []
+
+
+def _copy_decompressed(source, dst, codec, factory):
+    """
+    Copy the (possibly compressed) stream `source` to the file `dst`,
+    decompressing on the fly. Returns the number of bytes read from `source`.
+    """
+    if codec == 'ZIP':
+        # Spool the archive (kept in memory only while small) and extract the first member
+        with tempfile.SpooledTemporaryFile(max_size=READ_BUFFER_SIZE * 8) as tmp:
+            shutil.copyfileobj(source, tmp, READ_BUFFER_SIZE)
+            read = tmp.tell()
+            tmp.seek(0)
+            with zipfile.ZipFile(tmp) as zf, nse_csv.open_zip_member(zf, zf.namelist()[0]) as member:
+                shutil.copyfileobj(member, dst, READ_BUFFER_SIZE)
+        return read
+    
+    decompressor = factory() if factory is not None else None
+    read = 0
+    while True:
+        chunk = source.read(READ_BUFFER_SIZE)
+        if not chunk:
+            break
+        read += len(chunk)
+        dst.write(decompressor.decompress(chunk) if decompressor is not None else chunk)
+    if decompressor is not None and hasattr(decompressor, 'flush'):
+        dst.write(decompressor.flush())
+    return read
+
 
 class NSEAPIDownloader:
     """
     Download NSE F&O reports using official API endpoints
     """
     
-    def __init__(self):
-        self.base_url = "https://www.nseindia.com"
-        self.session = requests.Session()
+    def __init__(self, parquet_dir=None):
+        self.base_url = BASE_URL
+        # Optional year/month partitioned Parquet copy of every verified download
+        self.parquet_dir = parquet_dir
+        # Pooled session (with retry/backoff on 429/5xx) shared by all NSE downloaders
+        self.session = get_session()
+        # Shared by all worker threads to stay under NSE's request throttle
+        self.rate_limiter = RateLimiter(calls=5, per=1)
+        # Per-date results log; shared by all instances, written by a background thread
+        self.result_log = get_file_logger('participant_tv', RESULT_LOG_FILE)
         self._setup_session()
     
     def _setup_session(self):
         """Setup session with proper headers for NSE API"""
-        self.session.headers.update({
+        # Sent per request, since the session is shared with other downloaders
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'en-US,en;q=0.9',
@@ -34,16 +232,36 @@ class NSEAPIDownloader:
             'Connection': 'keep-alive',
             'Referer': 'https://www.nseindia.com/all-reports-derivatives',
             'X-Requested-With': 'XMLHttpRequest'
-        })
+        }
         
+        # Cookies saved by an earlier run (nse_cookies.txt) are reused; only warm up without them
+        if not has_cookies(self.session):
+            self._init_cookies()
+    
+    def _init_cookies(self):
+        """Get cookies by visiting the reports page"""
         try:
-            response = self.session.get(
+            self.session.get(
                 f"{self.base_url}/all-reports-derivatives",
+                headers=self.headers,
                 timeout=10
             )
-            print("✓ Session initialized with cookies")
+            logger.info("✓ Session initialized with cookies")
         except Exception as e:
-            print(f"! Warning during session init: {e}")
+            logger.warning("! Warning during session init: %s", e)
+    
+    def _get(self, url, **kwargs):
+        """Rate-limited GET on the shared session"""
+        self.rate_limiter.wait()
+        response = self.session.get(url, headers=self.headers, **kwargs)
+        
+        # Cookies expired - warm the session up again and retry once
+        if response.status_code in (401, 403):
+            response.close()
+            self._init_cookies()
+            self.rate_limiter.wait()
+            response = self.session.get(url, headers=self.headers, **kwargs)
+        return response
     
     def _build_api_url(self, report_config, date_str):
         """Build NSE API URL with proper encoding"""
@@ -71,176 +289,119 @@ class NSEAPIDownloader:
         4. Removed commented-out dead code
         """
         if isinstance(date, str):
-            try:
-                if '-' in date:
-                    dt = datetime.strptime(date, "%d-%b-%Y")
-                else:
-                    dt = datetime.strptime(date, "%d%b%Y")
-            except:
-                dt = datetime.strptime(date, "%Y-%m-%d")
+            dt = datetime.strptime(date, _date_format(date))
         else:
             dt = date
         
         date_str = dt.strftime("%d-%b-%Y")
         
-        print(f"\n{'='*70}")
-        print(f"Downloading Participant Trading Volumes via NSE API")
-        print(f"Date: {date_str}")
-        print(f"{'='*70}\n")
+        logger.info("Downloading Participant Trading Volumes via NSE API for %s", date_str)
         
-        report_config = {
-            "name": "F&O - Participant wise Trading Volumes(csv)",
-            "type": "archives",
-            "category": "derivatives",
-            "section": "equity"
-        }
+        api_url = PARTICIPANT_TV_URL.format(date_str=date_str)
         
-        api_url = self._build_api_url(report_config, date_str)
+        logger.debug("API URL: %s", api_url)
         
-        print(f"API URL: {api_url}\n")
-        print(f"Making API request...")
-        
-        # FIXED: Declare logging variables in proper scope
-        log_filepath = "log_participant_tv.log"
-        successful = []
-        failed = []
+        # Saved path, set just before the successful return; logged in finally
+        saved_path = None
+        # Streamed response, closed in finally on every path so its pooled
+        # connection is released
+        response = None
         
         try:
-            response = self.session.get(api_url, timeout=20)
+            response = self._get(api_url, timeout=20, stream=True)
             
-            print(f"Response Status: {response.status_code}")
-            print(f"Content-Type: {response.headers.get('Content-Type', 'Unknown')}")
-            print(f"Content-Length: {len(response.content):,} bytes")
+            # Looked up once; the body is streamed, so it is never materialised
+            headers = response.headers
+            content_type = headers.get('Content-Type', '')
+            logger.debug("Response Status: %s", response.status_code)
+            logger.debug("Content-Type: %s", content_type or 'Unknown')
+            logger.debug("Content-Length: %s bytes", headers.get('Content-Length', 'Unknown'))
             
-            if response.status_code == 503:
-                print("Service temporarily unavailable (503)")
-                failed.append(dt.strftime("%d-%b-%Y"))
-                return None
-
             if response.status_code == 200:
-                successful.append(dt.strftime("%d-%b-%Y"))    
-                content = response.content
-                original_size = len(content)
-                
-                print(f"Original size: {original_size:,} bytes")
-                print(f"First 10 bytes (hex): {content[:10].hex()}")
-                
-                # Try multiple decompression methods
-                decompressed = False
+                # Stream the body: HTTP Content-Encoding is undone by urllib3, then
+                # any compression of the payload itself is detected from its first bytes
+                response.raw.decode_content = True
+                source = io.BufferedReader(response.raw, buffer_size=READ_BUFFER_SIZE)
+                head = source.peek(32)[:32]
+                logger.debug("First 10 bytes (hex): %s", head[:10].hex())
                 
-                # Method 1: Standard gzip
-                if not decompressed and content[:2] == b'\x1f\x8b':
-                    try:
-                        content = gzip.decompress(content)
-                        print(f"✓ Decompressed using GZIP: {original_size:,} → {len(content):,} bytes")
-                        decompressed = True
-                    except Exception as e:
-                        print(f"! GZIP failed: {e}")
-                
-                # Method 2: Zlib
-                if not decompressed:
-                    try:
-                        content = zlib.decompress(content)
-                        print(f"✓ Decompressed using ZLIB: {original_size:,} → {len(content):,} bytes")
-                        decompressed = True
-                    except:
-                        pass
-                
-                # Method 3: Raw deflate (zlib without header)
-                if not decompressed:
-                    try:
-                        content = zlib.decompress(content, -zlib.MAX_WBITS)
-                        print(f"✓ Decompressed using raw DEFLATE: {original_size:,} → {len(content):,} bytes")
-                        decompressed = True
-                    except:
-                        pass
-                
-                # Method 4: LZMA/XZ
-                if not decompressed:
-                    try:
-                        content = lzma.decompress(content)
-                        print(f"✓ Decompressed using LZMA: {original_size:,} → {len(content):,} bytes")
-                        decompressed = True
-                    except:
-                        pass
-                
-                # Method 5: Skip potential header bytes and try again
-                if not decompressed:
-                    for skip_bytes in [4, 8, 12, 16]:
-                        if len(content) > skip_bytes:
-                            try:
-                                test_content = gzip.decompress(content[skip_bytes:])
-                                content = test_content
-                                print(f"✓ Decompressed using GZIP after skipping {skip_bytes} bytes: {original_size:,} → {len(content):,} bytes")
-                                decompressed = True
-                                break
-                            except:
-                                pass
-                            
-                            try:
-                                test_content = zlib.decompress(content[skip_bytes:])
-                                content = test_content
-                                print(f"✓ Decompressed using ZLIB after skipping {skip_bytes} bytes: {original_size:,} → {len(content):,} bytes")
-                                decompressed = True
-                                break
-                            except:
-                                pass
-                
-                if not decompressed:
-                    print("! Could not decompress - saving as-is (might be plain text or unknown format)")
+                # A CSV/text Content-Type (with any Content-Encoding already undone)
+                # means a plain body: skip the wrapped-payload offset scan
+                codec, factory, skip_bytes = _detect_compression(
+                    head, scan_offsets=not content_type.lower().startswith(_TEXT_CONTENT_TYPES)
+                )
+                label = codec
+                if skip_bytes:
+                    source.read(skip_bytes)
+                    label = f"{codec} after skipping {skip_bytes} bytes"
                 
                 # Determine output filename
                 if output_file is None:
                     output_file = f"participant_tv_{dt.strftime('%Y%m%d')}.csv"
                 
                 output_dir = "./NSE_Downloads/FO_Participant_Volume"
-                os.makedirs(output_dir, exist_ok=True)
+                ensure_dir(output_dir)
                 filepath = os.path.join(output_dir, output_file)
                 
-                # Save to file
-                with open(filepath, 'wb') as f:
-                    f.write(content)
+                # Decompress straight to disk; the .part file only replaces the
+                # previous download once the whole body has been written
+                part_path = filepath + '.part'
+                try:
+                    with response, open(part_path, 'wb') as f:
+                        tee = _CsvTee(f)
+                        original_size = _copy_decompressed(source, tee, codec, factory)
+                        saved_size = f.tell()
+                    os.replace(part_path, filepath)
+                except Exception:
+                    # A decoder or write error leaves a truncated .part file behind
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    raise
                 
-                print(f"\n✓ Saved to: {filepath}")
+                if codec:
+                    logger.debug("✓ Decompressed using %s: %s → %s bytes", label, f"{original_size:,}", f"{saved_size:,}")
+                else:
+                    logger.debug("! No compression detected - saving as-is (might be plain text or unknown format)")
                 
-                # Verify it's valid CSV
-                try:
-                    df = pd.read_csv(filepath)
-                    print(f"✓ CSV verified: {df.shape[0]} rows, {df.shape[1]} columns")
-                    if len(df.columns) > 0:
-                        print(f"✓ Columns: {', '.join(df.columns[:5])}")
-                except Exception as e:
-                    print(f"! Could not parse as CSV: {e}")
+                logger.info("✓ Saved to: %s", filepath)
+                
+                # Verify it's valid CSV from what was seen while saving, without re-reading the file
+                columns = tee.columns
+                if columns:
+                    logger.debug("✓ CSV verified: %s rows, %s columns", tee.rows, len(columns))
+                    logger.debug("✓ Columns: %s", ', '.join(columns[:5]))
+                    
+                    if self.parquet_dir:
+                        # Best effort: a failed mirror is logged, the CSV is still the result
+                        parquet_path = nse_csv.write_parquet(filepath, self.parquet_dir, dt)
+                        if parquet_path:
+                            logger.debug("✓ Parquet copy: %s", parquet_path)
+                else:
+                    logger.warning("! Could not parse as CSV")
                     # Show a sample of the content for debugging
-                    try:
-                        sample = content[:200].decode('utf-8', errors='ignore')
-                        print(f"! Content sample: {sample}")
-                    except:
-                        print(f"! Binary content (hex): {content[:100].hex()}")
+                    logger.debug("! Content sample: %s", tee.head[:200].decode('utf-8', errors='ignore'))
                 
+                saved_path = filepath
                 return filepath
                 
             else:
-                print(f"\n✗ Failed with status code: {response.status_code}")
-                failed.append(dt.strftime("%d-%b-%Y"))
-                if response.text:
-                    print(f"Response: {response.text[:200]}")
+                logger.error("✗ Failed with status code: %s", response.status_code)
+                if logger.isEnabledFor(logging.DEBUG) and response.text:
+                    logger.debug("Response: %s", response.text[:200])
                 return None
     
         except Exception as e:
-            print(f"\n✗ Error: {str(e)}")
-            failed.append(dt.strftime("%d-%b-%Y"))
-            import traceback
-            traceback.print_exc()
+            logger.exception("✗ Error: %s", e)
             return None
             
         finally:
+            if response is not None:
+                response.close()
             # Log results
-            with open(log_filepath, 'a') as f:
-                f.write(f"Date: {date_str}\n")
-                f.write(f"Successful: {successful}\n")
-                f.write(f"Failed: {failed}\n")
-                f.write("-" * 50 + "\n")
+            self.result_log.info(
+                "Date: %s\nSuccessful: %s\nFailed: %s\n%s",
+                date_str, [date_str] if saved_path else [], [] if saved_path else [date_str], "-" * 50
+            )
     
     def list_available_reports(self, category="derivatives", section="equity"):
         """List all available reports for a category"""
@@ -287,43 +448,52 @@ class NSEAPIDownloader:
         
         return fo_reports
     
-    def download_date_range(self, start_date, end_date, output_dir="./nse_data"):
+    def download_date_range(self, start_date, end_date, output_dir="./nse_data", max_workers=8):
         """
-        Download Participant TV for a date range
+        Download Participant TV for a date range using a pool of worker threads
         
         FIXED ISSUES:
         1. Properly handle return value from download_participant_tv
         2. Fixed success/failure tracking logic
         """
-        current = start_date
         successful = []
         failed = []
+        results = {}
+        
+        # Skip weekends (Saturday=5, Sunday=6) and NSE holidays before dispatching
+        holidays = get_trading_holidays()
+        dates = [
+            date
+            for date in (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
+            if date.weekday() < 5 and date.date() not in holidays
+        ]
         
-        while current <= end_date:
-            # Skip weekends (Saturday=5, Sunday=6)
-            if current.weekday() < 5:  
+        # More workers than pooled connections would just open and discard sockets
+        with ThreadPoolExecutor(max_workers=min(max_workers, POOL_SIZE)) as executor:
+            futures = {executor.submit(self.download_participant_tv, date): date for date in dates}
+            for future in as_completed(futures):
+                date = futures[future]
                 try:
-                    result = self.download_participant_tv(current)
-                    
-                    # FIXED: Properly check if download was successful
-                    if result:  # result is filepath if successful, None if failed
-                        successful.append(current.strftime("%d-%b-%Y"))
-                    else:
-                        failed.append(current.strftime("%d-%b-%Y"))
-                        
+                    results[date] = future.result()
                 except Exception as e:
-                    print(f"Error downloading {current.strftime('%d-%b-%Y')}: {e}")
-                    failed.append(current.strftime("%d-%b-%Y"))
-            
-            current += timedelta(days=1)
+                    logger.error("Error downloading %s: %s", date.strftime('%d-%b-%Y'), e)
+                    results[date] = None
+        
+        # Report in date order regardless of completion order
+        # (result is filepath if successful, None if failed)
+        for date in dates:
+            if results.get(date):
+                successful.append(date.strftime("%d-%b-%Y"))
+            else:
+                failed.append(date.strftime("%d-%b-%Y"))
         
-        print(f"\n{'='*50}")
-        print(f"Download Summary:")
-        print(f"  Successful: {len(successful)}")
-        print(f"  Failed: {len(failed)}")
+        logger.info("\n%s", '=' * 50)
+        logger.info("Download Summary:")
+        logger.info("  Successful: %d", len(successful))
+        logger.info("  Failed: %d", len(failed))
         if failed:
-            print(f"  Failed dates: {', '.join(failed)}")
-        print(f"{'='*50}\n")
+            logger.info("  Failed dates: %s", ', '.join(failed))
+        logger.info("%s\n", '=' * 50)
         
         return successful, failed
 
@@ -1,12 +1,29 @@
 import asyncio
 import aiohttp
 import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
 import logging
 import time
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import pandas as pd
 
+import step_2_create_fudata_sheet
+from step_2_create_fudata_sheet import FuDataSheetCreator
+
+# orjson decodes straight from bytes, 2-5x faster than the stdlib json module
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# libuv-based event loop, when installed (not available on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Import configuration
 # from config import *
 # config.py
@@ -47,6 +64,7 @@ SYMBOLS_CSV = 'symbols.csv'
 OUTPUT_DIR = './Nse_files'
 LOG_FILE = 'processing.log'
 SUMMARY_FILE = 'processing_summary.csv'
+SUMMARY_FIELDS = ['symbol', 'status', 'time', 'error', 'output']  # SUMMARY_FILE columns
 
 # Default lot size
 DEFAULT_LOT_SIZE = 125
@@ -67,26 +85,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def init_worker():
+    """
+    Process pool initializer: the pool already runs one worker per core, so
+    each worker reads its bhavcopies on a single thread (no READ_WORKERS
+    threads, no pyarrow CPU pool) instead of oversubscribing the cores
+    """
+    step_2_create_fudata_sheet.READ_WORKERS = 1
+    if step_2_create_fudata_sheet.pa is not None:
+        step_2_create_fudata_sheet.pa.set_cpu_count(1)
+
+def process_symbol_sync(symbol: str, year: int, lot_size: int, file_list: List[str]) -> Dict:
+    """Synchronous processing (runs in a worker process, so it must be picklable)"""
+    logger.info("Processing symbol: %s", symbol)
+    start_ns = time.perf_counter_ns()
+    
+    creator = FuDataSheetCreator(symbol=symbol, lot_size=lot_size)
+    creator.list_exp_start(file_list)
+    contracts_data = creator.create_fudata_sheet()
+    
+    # One workbook per symbol: regrate_main_eq.py opens each symbol's file
+    # by this name, so results are not coalesced into per-batch workbooks
+    output_path = f'{OUTPUT_DIR}/{year}/{symbol}_FuData_Generated.xlsx'
+    creator.save_workbook(output_path)
+    
+    elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+    logger.info("✓ Completed %s in %.2fs", symbol, elapsed)
+    
+    return {
+        'symbol': symbol,
+        'status': 'success',
+        'time': elapsed,
+        'output': output_path
+    }
+
 class AsyncSymbolProcessor:
     """Async processor for handling multiple symbols concurrently"""
     
     def __init__(self):
         self.session = None
+        self.executor = None
         self.file_list = None
-        self.semaphore = asyncio.Semaphore(MAX_WORKERS)
         
     async def __aenter__(self):
         """Setup async context"""
         # Create session with connection pooling
         timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
-        connector = aiohttp.TCPConnector(limit=MAX_WORKERS)
+        # Everything goes to the one API host: let it use the whole pool and keep
+        # idle keep-alive connections around between batches
+        connector = aiohttp.TCPConnector(
+            limit=MAX_WORKERS,
+            limit_per_host=MAX_WORKERS,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
         self.session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        
+        # Workbook building is CPU-bound Python (openpyxl): one process per core,
+        # since threads would serialise on the GIL
+        self.executor = ProcessPoolExecutor(
+            max_workers=min(MAX_WORKERS, os.cpu_count() or 1),
+            initializer=init_worker,
+        )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Cleanup async context"""
         if self.session:
             await self.session.close()
+        if self.executor:
+            self.executor.shutdown(wait=True)
+    
+    async def _get(self, url: str, **kwargs) -> Tuple[int, bytes]:
+        """GET `url`, retrying dropped connections and timeouts with exponential backoff"""
+        for attempt in range(MAX_RETRIES):
+            try:
+                async with self.session.get(url, **kwargs) as response:
+                    return response.status, await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                delay = RETRY_DELAY * 2 ** attempt
+                logger.warning(f"Request to {url} failed ({e!r}), retrying in {delay}s")
+                await asyncio.sleep(delay)
     
     async def fetch_dates(self, year: int) -> List[str]:
         """Fetch dates asynchronously"""
@@ -94,15 +175,15 @@ class AsyncSymbolProcessor:
         logger.info(f"Fetching dates from: {url}...")
         
         try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    date_list = data.get("dates", [])
-                    logger.info(f"Successfully fetched {len(date_list)} dates")
-                    return date_list
-                else:
-                    logger.error(f"Failed to retrieve data. Status: {response.status}")
-                    return None
+            status, body = await self._get(url)
+            if status == 200:
+                data = json_loads(body)
+                date_list = data.get("dates", [])
+                logger.info(f"Successfully fetched {len(date_list)} dates")
+                return date_list
+            else:
+                logger.error(f"Failed to retrieve data. Status: {status}")
+                return None
         except Exception as e:
             logger.error(f"Error fetching dates: {e}")
             return None
@@ -112,36 +193,32 @@ class AsyncSymbolProcessor:
         url = f"http://127.0.0.1:5000/api/{year}/tracking"
         
         try:
-            async with self.session.get(url, json={}) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    file_list = [item["file_2"] for item in data.get("data", []) if "file_2" in item]
-                    logger.info(f"Successfully fetched {len(file_list)} files")
-                    self.file_list = file_list
-                    return file_list
-                else:
-                    logger.error(f"Error {response.status}: {await response.text()}")
-                    return None
+            status, body = await self._get(url, json={})
+            if status == 200:
+                data = json_loads(body)
+                file_list = [item["file_2"] for item in data.get("data", []) if "file_2" in item]
+                logger.info(f"Successfully fetched {len(file_list)} files")
+                self.file_list = file_list
+                return file_list
+            else:
+                logger.error(f"Error {status}: {body.decode(errors='replace')}")
+                return None
         except Exception as e:
             logger.error(f"Error fetching file list: {e}")
             return None
     
-    async def process_symbol(self, symbol: str, year: int, lot_size: int = DEFAULT_LOT_SIZE) -> Dict:
-        """Process a single symbol with semaphore for concurrency control"""
-        async with self.semaphore:
-            return await self._process_symbol_impl(symbol, year, lot_size)
-    
     async def _process_symbol_impl(self, symbol: str, year: int, lot_size: int) -> Dict:
         """Internal implementation of symbol processing"""
         try:
-            # Run CPU-bound work in thread pool
-            loop = asyncio.get_event_loop()
+            # Run CPU-bound work in the processor's process pool
+            loop = asyncio.get_running_loop()
             result = await loop.run_in_executor(
-                None, 
-                self._process_symbol_sync, 
+                self.executor, 
+                process_symbol_sync, 
                 symbol, 
                 year, 
-                lot_size
+                lot_size,
+                self.file_list
             )
             return result
         except Exception as e:
@@ -152,58 +229,38 @@ class AsyncSymbolProcessor:
                 'error': str(e)
             }
     
-    def _process_symbol_sync(self, symbol: str, year: int, lot_size: int) -> Dict:
-        """Synchronous processing (runs in thread pool)"""
-        try:
-            from step_2_create_fudata_sheet import FuDataSheetCreator
-            
-            logger.info(f"Processing symbol: {symbol}")
-            start_time = time.time()
-            
-            creator = FuDataSheetCreator(symbol=symbol, lot_size=lot_size)
-            creator.list_exp_start(self.file_list)
-            contracts_data = creator.create_fudata_sheet()
-            
-            output_path = f'{OUTPUT_DIR}/{year}/{symbol}_FuData_Generated.xlsx'
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-            creator.save_workbook(output_path)
-            
-            elapsed = time.time() - start_time
-            logger.info(f"✓ Completed {symbol} in {elapsed:.2f}s")
-            
-            return {
-                'symbol': symbol,
-                'status': 'success',
-                'time': elapsed,
-                'output': output_path
-            }
-        except Exception as e:
-            raise
-    
     async def process_symbols_batch(self, symbols: List[str], year: int) -> List[Dict]:
-        """Process a batch of symbols concurrently"""
-        tasks = [self.process_symbol(symbol, year) for symbol in symbols]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        """Process a batch of symbols on at most MAX_WORKERS worker coroutines"""
+        queue = asyncio.Queue()
+        for item in enumerate(symbols):
+            queue.put_nowait(item)
+        # Filled by position so results keep symbol order
+        results = [None] * len(symbols)
+        total = len(symbols)
+        completed = 0
         
-        # Handle any exceptions
-        processed_results = []
-        for symbol, result in zip(symbols, results):
-            if isinstance(result, Exception):
-                processed_results.append({
-                    'symbol': symbol,
-                    'status': 'error',
-                    'error': str(result)
-                })
-            else:
-                processed_results.append(result)
+        async def worker():
+            nonlocal completed
+            # The queue is filled up front, so an empty queue means the batch is done
+            while not queue.empty():
+                i, symbol = queue.get_nowait()
+                results[i] = await self._process_symbol_impl(symbol, year, DEFAULT_LOT_SIZE)
+                # Report each symbol as it finishes rather than after the slowest one
+                completed += 1
+                logger.info("Batch progress: %d/%d (%s: %s)", completed, total, results[i]['status'], symbol)
         
-        return processed_results
+        await asyncio.gather(*(worker() for _ in range(min(MAX_WORKERS, len(symbols)))))
+        return results
     
     async def process_all_symbols(self, symbols: List[str], year: int) -> List[Dict]:
         """Process all symbols in batches"""
-        all_results = []
+        # One slot per symbol; each batch fills its own slice
+        all_results = [None] * len(symbols)
         total_batches = (len(symbols) + BATCH_SIZE - 1) // BATCH_SIZE
         
+        # Every symbol's workbook goes into the same year directory
+        Path(f"{OUTPUT_DIR}/{year}").mkdir(parents=True, exist_ok=True)
+        
         for i in range(0, len(symbols), BATCH_SIZE):
             batch = symbols[i:i + BATCH_SIZE]
             batch_num = i // BATCH_SIZE + 1
@@ -213,10 +270,10 @@ class AsyncSymbolProcessor:
             logger.info(f"{'='*60}\n")
             
             batch_results = await self.process_symbols_batch(batch, year)
-            all_results.extend(batch_results)
+            all_results[i:i + len(batch)] = batch_results
             
             # Progress update
-            completed = len(all_results)
+            completed = i + len(batch)
             total = len(symbols)
             logger.info(f"Overall Progress: {completed}/{total} ({completed/total*100:.1f}%)")
             
@@ -228,11 +285,9 @@ class AsyncSymbolProcessor:
 
 def load_symbols(csv_path: str = SYMBOLS_CSV) -> List[str]:
     """Load symbols from CSV file"""
-    symbols = []
     try:
-        with open(csv_path) as f:
-            reader = csv.DictReader(f)
-            symbols = [row['symbol'] for row in reader]
+        # Only the symbol column is needed; the C parser skips the rest
+        symbols = pd.read_csv(csv_path, usecols=['symbol'], dtype='string', engine='c')['symbol'].tolist()
         logger.info(f"Loaded {len(symbols)} symbols from {csv_path}")
         return symbols
     except Exception as e:
@@ -241,11 +296,22 @@ def load_symbols(csv_path: str = SYMBOLS_CSV) -> List[str]:
 
 def generate_summary_report(results: List[Dict], output_file: str = SUMMARY_FILE):
     """Generate a summary report of processing results"""
-    df = pd.DataFrame(results)
-    df.to_csv(output_file, index=False)
+    with open(output_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, restval='')
+        writer.writeheader()
+        writer.writerows(results)
     
-    success_count = len(df[df['status'] == 'success'])
-    error_count = len(df[df['status'] == 'error'])
+    # Counts and timings in a single pass over the results
+    success_count = error_count = 0
+    total_time = 0.0
+    failed = []
+    for result in results:
+        if result['status'] == 'success':
+            success_count += 1
+            total_time += result['time']
+        elif result['status'] == 'error':
+            error_count += 1
+            failed.append(result)
     
     logger.info(f"\n{'='*60}")
     logger.info("PROCESSING SUMMARY")
@@ -254,45 +320,45 @@ def generate_summary_report(results: List[Dict], output_file: str = SUMMARY_FILE
     logger.info(f"Successful: {success_count}")
     logger.info(f"Errors: {error_count}")
     
-    if 'time' in df.columns and success_count > 0:
-        avg_time = df[df['status'] == 'success']['time'].mean()
-        total_time = df[df['status'] == 'success']['time'].sum()
+    if success_count > 0:
+        avg_time = total_time / success_count
         logger.info(f"Average time per symbol: {avg_time:.2f}s")
         logger.info(f"Total processing time: {total_time:.2f}s")
     
     logger.info(f"\nDetailed report saved to: {output_file}")
     logger.info(f"{'='*60}\n")
     
-    if error_count > 0:
+    if failed:
         logger.warning("Failed symbols:")
-        for result in results:
-            if result['status'] == 'error':
-                logger.warning(f"  - {result['symbol']}: {result.get('error', 'Unknown error')}")
+        for result in failed:
+            logger.warning(f"  - {result['symbol']}: {result.get('error', 'Unknown error')}")
 
 async def main():
     """Main async execution function"""
     overall_start = time.time()
     
     async with AsyncSymbolProcessor() as processor:
-        # Step 1: Fetch dates
-        dates = await processor.fetch_dates(YEAR_TO_FETCH)
-        if not dates:
+        # Steps 1-3 do not depend on each other: fetch dates, run the initial
+        # setup (sync, in a thread) and fetch the file list concurrently
+        from step_1_equity_derivatives_list import start
+        logger.info("Running step_1_equity_derivatives_list...")
+        loop = asyncio.get_running_loop()
+        dates, step_1, file_list = await asyncio.gather(
+            processor.fetch_dates(YEAR_TO_FETCH),
+            loop.run_in_executor(None, start),
+            processor.fetch_file_list(YEAR_TO_FETCH),
+            return_exceptions=True,
+        )
+        
+        if not dates or isinstance(dates, Exception):
             logger.error("Failed to fetch dates. Exiting.")
             return
         
-        # Step 2: Run initial setup (sync operation)
-        try:
-            from step_1_equity_derivatives_list import start
-            logger.info("Running step_1_equity_derivatives_list...")
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, start)
-        except Exception as e:
-            logger.error(f"Error in step_1: {e}")
+        if isinstance(step_1, Exception):
+            logger.error(f"Error in step_1: {step_1}")
             return
         
-        # Step 3: Fetch file list
-        file_list = await processor.fetch_file_list(YEAR_TO_FETCH)
-        if not file_list:
+        if not file_list or isinstance(file_list, Exception):
             logger.error("Failed to fetch file list. Exiting.")
             return
         
@@ -314,4 +380,6 @@ async def main():
     logger.info(f"{'='*60}\n")
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
\ No newline at end of file
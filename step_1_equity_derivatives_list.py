@@ -16,10 +16,6 @@ headers = {
 session = requests.Session()
 session.headers.update(headers)
 
-# 1️⃣ Mandatory cookie warm-up
-session.get(BASE_URL, timeout=10)
-time.sleep(1)
-
 # 2️⃣ Fetch underlying info
 params = {
     "instrument": "equity_derivatives"
@@ -44,31 +40,28 @@ def write_csv(response):
     with open(FILENAME, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["symbol", "current_date","underlying"])
-        for symbol in final_list:
-            writer.writerow([symbol["symbol"], today, symbol["underlying"]])
+        # Same date on every row: format it once
+        current_date = today.isoformat()
+        writer.writerows([symbol["symbol"], current_date, symbol["underlying"]] for symbol in final_list)
     print("symbols.csv created successfully")
 
 def start():
-    if not os.path.exists(FILENAME):
-        # print("Not exist.")
-        response = session.get(API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        write_csv(response)
-    else:
-        with open("symbols.csv") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                row_date = datetime.strptime(row["current_date"], "%Y-%m-%d").date()
-                if row_date == today:
-                    # print("SKIP")
-                    continue  # 🚫 Skip API call
-                else:
-                    response = session.get(API_URL, params=params, timeout=10)
-                    response.raise_for_status()
-                    write_csv(response)
-                # print("response")
-                # break
-start()
+    # symbols.csv is rewritten whenever it is fetched, so a file modified today
+    # is already current: 🚫 Skip API call
+    if os.path.exists(FILENAME) and date.fromtimestamp(os.path.getmtime(FILENAME)) == today:
+        return
+    
+    # 1️⃣ Mandatory cookie warm-up
+    session.get(BASE_URL, timeout=10)
+    time.sleep(1)
+    
+    response = session.get(API_URL, params=params, timeout=10)
+    response.raise_for_status()
+    write_csv(response)
+
+
+if __name__ == "__main__":
+    start()
 # from step_2_create_fudata_sheet import FuDataSheetCreator
 # from step_3_create_eqdata_sheet import EqDataSheetCreator
 # from step_4_create_oc_sheet import OptionChainSheetCreator
@@ -11,14 +11,120 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+import io
+import os
 import random
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+
+# PyArrow's multithreaded CSV reader, when installed (pandas' C parser otherwise)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+except ImportError:
+    pa = pv = None
+
+# Futures instruments in the FO UDiFF bhavcopy: stock futures, index futures
+FUTURES_INSTRUMENTS = ("STF", "IDF")
+
+# contract_df columns, in the order they are written to the sheet
+CONTRACT_COLUMNS = ['Instrument', 'Symbol', 'Date', 'Expiry', 'Open', 'High', 'Low',
+                    'Close', 'LTP', 'Settle_Price', 'Contracts', 'Turnover_Lacs',
+                    'Open_Interest', 'Change_OI', 'OI_Contracts', 'Change_OI_Contracts']
+
+# Threads used to read a symbol's bhavcopies; the parse runs in pyarrow/pandas C
+# code, and the workbooks themselves are already built one process per core
+READ_WORKERS = 4
+
+# The bhavcopy columns the sheet uses, with their types (skips type inference)
+BHAV_DTYPES = {
+    "TradDt": "string",
+    "XpryDt": "string",
+    "TckrSymb": "category",
+    "FinInstrmTp": "category",
+    "OpnPric": "float64",
+    "HghPric": "float64",
+    "LwPric": "float64",
+    "ClsPric": "float64",
+    "LastPric": "float64",
+    "SttlmPric": "float64",
+    "TtlTradgVol": "int64",
+    "TtlTrfVal": "float64",
+    "OpnIntrst": "int64",
+    "ChngInOpnIntrst": "int64",
+    "NewBrdLotQty": "int64",
+}
+
+# Reader options built once and shared by every bhavcopy read; categorical
+# columns are read as Arrow dictionaries, which to_pandas turns into categories
+if pv is not None:
+    BHAV_READ_OPTIONS = pv.ReadOptions(use_threads=True, block_size=1 << 20)
+    BHAV_CONVERT_OPTIONS = pv.ConvertOptions(
+        include_columns=list(BHAV_DTYPES),
+        column_types={
+            name: pa.dictionary(pa.int32(), pa.string()) if alias == "category" else pa.type_for_alias(alias)
+            for name, alias in BHAV_DTYPES.items()
+        },
+    )
+
+
+# Daily FO UDiFF bhavcopies saved by the downloader
+BHAV_DIR = os.path.join("NSE_Downloads", "FO_Bhavcopy")
+
+
+@lru_cache(maxsize=4096)
+def _bhav_path(trade_date):
+    """Absolute bhavcopy path for a trading date, memoised like _display_date"""
+    return os.path.abspath(os.path.join(BHAV_DIR, f"FO_UDiFF_{trade_date:%Y%m%d}.csv"))
+
+
+@lru_cache(maxsize=4096)
+def _display_date(ts):
+    """Sheet format for a date, memoised: each trading date recurs in every contract open on it"""
+    return ts.strftime("%d-%b-%Y")
+
+
+@lru_cache(maxsize=1024)
+def _load_bhav(path, symbol):
+    """
+    Futures rows (STF/IDF) for `symbol` from the bhavcopy at `path`, with
+    TradDt/XpryDt parsed. Cached: list_exp_start and every contract open
+    during a trading date read the same file, so each is parsed once.
+    Callers must not modify the returned DataFrame.
+    """
+    if pv is not None:
+        table = pv.read_csv(path, read_options=BHAV_READ_OPTIONS, convert_options=BHAV_CONVERT_OPTIONS)
+        df = table.to_pandas()
+    else:
+        df = pd.read_csv(path, usecols=list(BHAV_DTYPES), dtype=BHAV_DTYPES)
+    # Both columns are categorical: compare the int codes, not the strings
+    tickers = df["TckrSymb"].cat
+    if symbol in tickers.categories:
+        is_symbol = tickers.codes.to_numpy() == tickers.categories.get_loc(symbol)
+    else:
+        is_symbol = np.zeros(len(df), dtype=bool)
+    df = df[is_symbol & df["FinInstrmTp"].isin(FUTURES_INSTRUMENTS).to_numpy()].copy()
+    df["TradDt"] = pd.to_datetime(df["TradDt"], errors="coerce")
+    df["XpryDt"] = pd.to_datetime(df["XpryDt"], errors="coerce")
+    return df
+
 
 class FuDataSheetCreator:
     """Create FuData sheet with multiple futures contracts"""
     
+    # Shared style objects and number formats, assigned by reference to every cell
+    HEADER_FONT = Font(bold=True)
+    HEADER_FILL = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+    SYMBOL_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+    DATE_FORMAT = 'DD-MMM-YY'
+    PRICE_FORMAT = '0.00'
+    AMOUNT_FORMAT = '#,##0.00'
+    
     def __init__(self, symbol='ABB', lot_size=125):
         self.symbol = symbol
         self.lot_size = lot_size
@@ -64,24 +170,74 @@ class FuDataSheetCreator:
         self.ws = None
         
     def create_workbook(self):
-        """Create new Excel workbook"""
-        self.wb = Workbook()
-        self.ws = self.wb.active
-        self.ws.title = "FuData"
+        """Create new Excel workbook (write-only, so cells are streamed to disk on save)"""
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("FuData")
+        # A write-only sheet only takes whole rows, in order, while contracts are
+        # written column block by column block; stage plain values here instead
+        # of one openpyxl Cell object per cell, and stream the rows in save_workbook
+        self._cells = defaultdict(dict)   # row -> {column: value}
+        self._styles = {}                 # (row, column) -> {attribute: style}
+        self._number_formats = {}         # column -> number format for data rows
         print("✓ Created new workbook")
     
+    def _set_cell(self, row, column, value):
+        """Stage a cell value"""
+        self._cells[row][column] = value
+    
+    def _style_cell(self, row, column, **styles):
+        """Stage cell styles (font, fill, ...)"""
+        self._styles.setdefault((row, column), {}).update(styles)
+    
+    def _write_rows(self):
+        """Stream the staged cells to the write-only sheet in row order"""
+        last_row = max(self._cells, default=0)
+        # Data rows carry no styles and the same number format per column, so
+        # the format of every column is looked up once instead of per cell
+        last_column = max((max(values, default=0) for values in self._cells.values()), default=0)
+        formats = [None] + [self._number_formats.get(column) for column in range(1, last_column + 1)]
+        for row in range(1, last_row + 1):
+            # Each row's staged values are released as soon as it is written
+            values = self._cells.pop(row, {})
+            columns = range(1, max(values, default=0) + 1)
+            if row >= 6:
+                cells = [self._data_cell(values.get(column), formats[column]) for column in columns]
+            else:
+                cells = [self._header_cell(values.get(column), self._styles.get((row, column)))
+                         for column in columns]
+            self.ws.append(cells)
+        self._styles.clear()
+    
+    def _data_cell(self, value, number_format):
+        """Data row value; a formatted cell only when the column has a number format"""
+        if number_format is None or value is None:
+            return value
+        cell = WriteOnlyCell(self.ws, value=value)
+        cell.number_format = number_format
+        return cell
+    
+    def _header_cell(self, value, styles):
+        """Header row value; a styled cell only when styles were staged for it"""
+        if not styles:
+            return value
+        cell = WriteOnlyCell(self.ws, value=value)
+        for attribute, style in styles.items():
+            setattr(cell, attribute, style)
+        return cell
+    
     def generate_price_series(self, start_date, end_date, base_price):
         """Generate realistic price series using random walk"""
         dates = pd.date_range(start=start_date, end=end_date, freq='B')  # Business days
         
+        # Random walk: the shocks are drawn in one call, but the clamp is applied
+        # per step, since each price depends on the clamped previous one
+        shocks = np.random.normal(0, self.volatility, size=max(len(dates) - 1, 0))
+        low, high = base_price * 0.7, base_price * 1.3
         prices = [base_price]
-        for i in range(1, len(dates)):
-            # Random walk with drift
-            change = np.random.normal(0, self.volatility) * prices[-1]
-            new_price = prices[-1] + change
+        for shock in shocks.tolist():
+            new_price = prices[-1] + shock * prices[-1]
             # Keep prices in reasonable range
-            new_price = max(min(new_price, base_price * 1.3), base_price * 0.7)
-            prices.append(new_price)
+            prices.append(max(min(new_price, high), low))
         
         df = pd.DataFrame({
             'Date': dates,
@@ -91,70 +247,45 @@ class FuDataSheetCreator:
         return df
     def generate_contract(self, expiry_date, contract_num):
         # print(expiry_date, contract_num)
-        contract_data = []
+        # The contract's row from each trading date's bhavcopy, built into the
+        # sheet columns in one vectorised pass below
+        slices = []
         for d in self.start_dates_dist[expiry_date]:
             # print(d,"kkk", f"./NSE_Downloads/FO_Bhavcopy/FO_UDiFF_{d.strftime('%Y%m%d')}.csv")
-            from pathlib import Path
-            file_path = Path(f"./NSE_Downloads/FO_Bhavcopy/FO_UDiFF_{d.strftime('%Y%m%d')}.csv")
+            file_path = _bhav_path(d)
 
-            if file_path.exists():
+            if os.path.isfile(file_path):
                 print(f"{file_path} File exists")
-                df = pd.read_csv(file_path)
-                # print(df,"@@@@@@@@@@@@@@@")
-                df["TradDt"] = pd.to_datetime(df["TradDt"], errors="coerce")
-                df["XpryDt"] = pd.to_datetime(df["XpryDt"], errors="coerce")
-                # max_expiry = df["XpryDt"].max()
-                # print(max_expiry)
-                filtered_df = df[
-                    (df["TckrSymb"] == f"{self.symbol}") 
-                    &
-                    (
-                        (df["FinInstrmTp"] == "STF") |
-                        (df["FinInstrmTp"] == "IDF")
-                    )
-                ]
-                # print(filtered_df)
-                # max_expiry = filtered_df["XpryDt"].max()
-                # df_max = filtered_df[filtered_df["XpryDt"] == max_expiry]
-                # print(
-                #     df_max
-                # )
+                filtered_df = _load_bhav(file_path, self.symbol)
                 df_max = filtered_df[filtered_df["XpryDt"] == expiry_date]
-                row = df_max.iloc[0]
-                # print(row)
-                # if hasattr(row["TradDt"], "strftime") else row["TradDt"]
-                record = {
-                    "Instrument": "FUTSTK",
-                    "Symbol": row["TckrSymb"],
-                    "Date": row["TradDt"].strftime("%d-%b-%Y") ,
-                    "Expiry": row["XpryDt"].strftime("%d-%b-%Y"),
-                    "Open": float(row["OpnPric"]),
-                    "High": float(row["HghPric"]),
-                    "Low": float(row["LwPric"]),
-                    "Close": float(row["ClsPric"]),
-                    "LTP": float(row["LastPric"]),
-                    "Settle_Price": float(row["SttlmPric"]),
-                    "Contracts": int(row["TtlTradgVol"]),
-                    "Turnover_Lacs": int(row["TtlTrfVal"]//100000),
-                    "Open_Interest": int(row["OpnIntrst"]),
-                    "Change_OI": int(row["ChngInOpnIntrst"]),
-                    "OI_Contracts": int(row["TtlTradgVol"]),
-                    "Change_OI_Contracts": int(row["TtlTradgVol"]),
-                }
-                # print(record)
-                contract_data.append(record)
-                # print(start_date, max_expiry)
-                # # if start_date not in self.start_dates:
-                # #     self.start_dates.append(start_date)
-                # if max_expiry not in self.expiries:
-                #     self.expiries.append(max_expiry)
+                slices.append(df_max.iloc[[0]])
             else:
                 pass
                 # print(f"{file_path} File does not exist")
-            # dates.append(current_date)
-            # current_date += timedelta(days=1)
-        ##############
-        return pd.DataFrame(contract_data)
+        
+        if not slices:
+            return pd.DataFrame()
+        
+        rows = pd.concat(slices, ignore_index=True)
+        return pd.DataFrame({
+            "Instrument": "FUTSTK",
+            "Symbol": rows["TckrSymb"].astype(str),
+            "Date": rows["TradDt"].map(_display_date),
+            # Every row is the same contract, so the expiry is formatted once
+            "Expiry": _display_date(rows["XpryDt"].iloc[0]),
+            "Open": rows["OpnPric"].astype("float64"),
+            "High": rows["HghPric"].astype("float64"),
+            "Low": rows["LwPric"].astype("float64"),
+            "Close": rows["ClsPric"].astype("float64"),
+            "LTP": rows["LastPric"].astype("float64"),
+            "Settle_Price": rows["SttlmPric"].astype("float64"),
+            "Contracts": rows["TtlTradgVol"].astype("int64"),
+            "Turnover_Lacs": (rows["TtlTrfVal"] // 100000).astype("int64"),
+            "Open_Interest": rows["OpnIntrst"].astype("int64"),
+            "Change_OI": rows["ChngInOpnIntrst"].astype("int64"),
+            "OI_Contracts": rows["TtlTradgVol"].astype("int64"),
+            "Change_OI_Contracts": rows["TtlTradgVol"].astype("int64"),
+        })
 
 
     def generate_contract_data(self, expiry_date, start_date, contract_num):
@@ -332,37 +463,41 @@ class FuDataSheetCreator:
     def write_contract_header(self, col_start, expiry_date, start_date, contract_df):
         """Write header rows for a contract"""
         
+        # Header figures, taken from the contract's columns in one place
+        oi_contracts = contract_df['OI_Contracts'].to_numpy()
+        present_settle = contract_df['Settle_Price'].iat[-1]
+        
         # Row 1 - Symbol, Lot Size, Max Contracts
-        self.ws.cell(row=1, column=col_start, value="Symbol =")
-        self.ws.cell(row=1, column=col_start+1, value=self.symbol)
-        self.ws.cell(row=1, column=col_start+2, value="Lot Size =")
-        self.ws.cell(row=1, column=col_start+3, value=self.lot_size)
-        self.ws.cell(row=1, column=col_start+4, value="Max. Contracts =")
-        self.ws.cell(row=1, column=col_start+6, value=self.max_contracts)
-        self.ws.cell(row=1, column=col_start+7, value=self.max_contracts_value)
-        self.ws.cell(row=1, column=col_start+9, value="Opening OI Contracts =")
-        self.ws.cell(row=1, column=col_start+14, value="Opening Settle Price")
+        self._set_cell(1, col_start, "Symbol =")
+        self._set_cell(1, col_start+1, self.symbol)
+        self._set_cell(1, col_start+2, "Lot Size =")
+        self._set_cell(1, col_start+3, self.lot_size)
+        self._set_cell(1, col_start+4, "Max. Contracts =")
+        self._set_cell(1, col_start+6, self.max_contracts)
+        self._set_cell(1, col_start+7, self.max_contracts_value)
+        self._set_cell(1, col_start+9, "Opening OI Contracts =")
+        self._set_cell(1, col_start+14, "Opening Settle Price")
         
         # Row 2 - Expiry, 90% Max OI, Present OI
-        self.ws.cell(row=2, column=col_start+1, value="Expiry =")
-        self.ws.cell(row=2, column=col_start+2, value=expiry_date.strftime("%d-%b-%Y"))
-        self.ws.cell(row=2, column=col_start+4, value="90% of Max. OI Contracts =")
-        self.ws.cell(row=2, column=col_start+7, value=round(self.max_contracts_value * 0.9, 4))
-        self.ws.cell(row=2, column=col_start+9, value="Present OI Contracts =")
-        self.ws.cell(row=2, column=col_start+12, value=contract_df['OI_Contracts'].iloc[-1])
-        self.ws.cell(row=2, column=col_start+13, value=contract_df['Settle_Price'].iloc[-1])
-        self.ws.cell(row=2, column=col_start+14, value="Present settle Price")
+        self._set_cell(2, col_start+1, "Expiry =")
+        self._set_cell(2, col_start+2, expiry_date.strftime("%d-%b-%Y"))
+        self._set_cell(2, col_start+4, "90% of Max. OI Contracts =")
+        self._set_cell(2, col_start+7, round(self.max_contracts_value * 0.9, 4))
+        self._set_cell(2, col_start+9, "Present OI Contracts =")
+        self._set_cell(2, col_start+12, oi_contracts[-1])
+        self._set_cell(2, col_start+13, present_settle)
+        self._set_cell(2, col_start+14, "Present settle Price")
         
         # Row 3 - Start date, Max OI month
-        self.ws.cell(row=3, column=col_start+1, value="Start dt. =")
-        if start_date:
-            start_date = pd.to_datetime(start_date).strftime("%d-%b-%Y")
-        self.ws.cell(row=3, column=col_start+2, value=start_date)
-        self.ws.cell(row=3, column=col_start+4, value="Max. OI Contracts month =")
-        self.ws.cell(row=3, column=col_start+7, value=contract_df['OI_Contracts'].max())
-        self.ws.cell(row=3, column=col_start+9, value="OI Low")
-        self.ws.cell(row=3, column=col_start+11, value="Rows =")
-        self.ws.cell(row=3, column=col_start+12, value=len(contract_df))
+        self._set_cell(3, col_start+1, "Start dt. =")
+        # start_date is the previous contract's last Date cell, already formatted
+        # as DD-Mon-YYYY, so it is written as is rather than re-parsed
+        self._set_cell(3, col_start+2, start_date)
+        self._set_cell(3, col_start+4, "Max. OI Contracts month =")
+        self._set_cell(3, col_start+7, oi_contracts.max())
+        self._set_cell(3, col_start+9, "OI Low")
+        self._set_cell(3, col_start+11, "Rows =")
+        self._set_cell(3, col_start+12, len(oi_contracts))
         
         # Row 5 - Column headers
         headers = ['Instrument', 'Symbol', 'Date', 'Expiry', 'Open', 'High', 'Low', 
@@ -370,42 +505,25 @@ class FuDataSheetCreator:
                   'Open Int', 'Change in OI', 'OI Contracts', 'Change in OI Contracts']
         
         for i, header in enumerate(headers):
-            cell = self.ws.cell(row=5, column=col_start+i, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+            self._set_cell(5, col_start+i, header)
+            self._style_cell(5, col_start+i, font=self.HEADER_FONT, fill=self.HEADER_FILL)
     
     def write_contract_data(self, col_start, contract_df):
         """Write data rows for a contract"""
         
         start_row = 6
         
-        for idx, row in contract_df.iterrows():
-            self.ws.cell(row=start_row+idx, column=col_start, value=row['Instrument'])
-            self.ws.cell(row=start_row+idx, column=col_start+1, value=row['Symbol'])
-            self.ws.cell(row=start_row+idx, column=col_start+2, value=row['Date'])
-            self.ws.cell(row=start_row+idx, column=col_start+3, value=row['Expiry'])
-            self.ws.cell(row=start_row+idx, column=col_start+4, value=row['Open'])
-            self.ws.cell(row=start_row+idx, column=col_start+5, value=row['High'])
-            self.ws.cell(row=start_row+idx, column=col_start+6, value=row['Low'])
-            self.ws.cell(row=start_row+idx, column=col_start+7, value=row['Close'])
-            self.ws.cell(row=start_row+idx, column=col_start+8, value=row['LTP'])
-            self.ws.cell(row=start_row+idx, column=col_start+9, value=row['Settle_Price'])
-            self.ws.cell(row=start_row+idx, column=col_start+10, value=row['Contracts'])
-            self.ws.cell(row=start_row+idx, column=col_start+11, value=row['Turnover_Lacs'])
-            self.ws.cell(row=start_row+idx, column=col_start+12, value=row['Open_Interest'])
-            self.ws.cell(row=start_row+idx, column=col_start+13, value=row['Change_OI'])
-            self.ws.cell(row=start_row+idx, column=col_start+14, value=row['OI_Contracts'])
-            self.ws.cell(row=start_row+idx, column=col_start+15, value=row['Change_OI_Contracts'])
+        # One staged row per tuple, instead of a Series and 16 cell calls per row
+        rows = contract_df[CONTRACT_COLUMNS].itertuples(index=False, name=None)
+        columns = range(col_start, col_start + len(CONTRACT_COLUMNS))
+        for idx, values in enumerate(rows):
+            self._cells[start_row+idx].update(zip(columns, values))
     
     def apply_formatting(self, col_start):
         """Apply formatting to contract columns"""
         
-        # Style header cells
-        yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-        
         # Symbol header
-        self.ws.cell(row=1, column=col_start).fill = yellow_fill
-        self.ws.cell(row=1, column=col_start).font = Font(bold=True)
+        self._style_cell(1, col_start, fill=self.SYMBOL_FILL, font=self.HEADER_FONT)
         
         # Set column widths
         for i in range(18):
@@ -419,20 +537,16 @@ class FuDataSheetCreator:
             else:
                 self.ws.column_dimensions[col_letter].width = 11
         
-        # Format date columns
-        for row in range(6, self.ws.max_row + 1):
-            date_cell = self.ws.cell(row=row, column=col_start+2)
-            date_cell.number_format = 'DD-MMM-YY'
-            
-            expiry_cell = self.ws.cell(row=row, column=col_start+3)
-            expiry_cell.number_format = 'DD-MMM-YY'
-            
-            # Format number columns
-            for col_offset in [4, 5, 6, 7, 8, 9]:  # Price columns
-                self.ws.cell(row=row, column=col_start+col_offset).number_format = '0.00'
-            
-            for col_offset in [11, 12, 13]:  # Turnover and OI value columns
-                self.ws.cell(row=row, column=col_start+col_offset).number_format = '#,##0.00'
+        # Format date columns (applied to the data rows when they are written)
+        self._number_formats[col_start+2] = self.DATE_FORMAT
+        self._number_formats[col_start+3] = self.DATE_FORMAT
+        
+        # Format number columns
+        for col_offset in [4, 5, 6, 7, 8, 9]:  # Price columns
+            self._number_formats[col_start+col_offset] = self.PRICE_FORMAT
+        
+        for col_offset in [11, 12, 13]:  # Turnover and OI value columns
+            self._number_formats[col_start+col_offset] = self.AMOUNT_FORMAT
     
 
 
@@ -457,9 +571,14 @@ class FuDataSheetCreator:
         # print(
         #     self.start_dates_dist.keys()
         # )
-        for i, expiry in enumerate(self.start_dates_dist.keys()):
+        # Contracts are independent: build their DataFrames concurrently, then
+        # write them to the sheet in order (the sheet itself is not thread safe)
+        expiries = list(self.start_dates_dist.keys())
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            contract_dfs = list(executor.map(self.generate_contract, expiries, range(len(expiries))))
+        
+        for i, (expiry, contract_df) in enumerate(zip(expiries, contract_dfs)):
             # print(i, expiry)
-            contract_df = self.generate_contract(expiry, i)
             # print(
             #     contract_df['Date'].iloc[-1]
             # )
@@ -511,7 +630,13 @@ class FuDataSheetCreator:
     def save_workbook(self, filename='ABB_FuData_Generated.xlsx'):
         """Save the workbook"""
         # filename = f"./future/{self.symbol}_FuData_Generated.xlsx"
-        self.wb.save(filename)
+        self._write_rows()
+        # Zip the xlsx in memory (zipfile emits many small writes), then hit the
+        # disk with a single write; the compressed file is only a few MB
+        buffer = io.BytesIO()
+        self.wb.save(buffer)
+        with open(filename, 'wb') as f:
+            f.write(buffer.getbuffer())
         print(f"\n✓ Saved workbook: {filename}")
         return filename
     
@@ -584,33 +709,23 @@ class FuDataSheetCreator:
     #         self.expiries
     #     )
     def list_exp_start(self, files):
-        import os
         # folder_path = "./NSE_Downloads/FO_Bhavcopy"
         print(self.symbol)
-        for file_path in files:
-            # print(file_path)
-            if file_path == 'None':
-                continue
-            df = pd.read_csv(file_path)
+        paths = [os.path.abspath(file_path) for file_path in files if file_path != 'None']
+        # Read the files concurrently, each distinct file once (the pool keeps
+        # READ_WORKERS opens/reads in flight); they are merged below in list order
+        unique_paths = list(dict.fromkeys(paths))
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            loaded = dict(zip(unique_paths, executor.map(_load_bhav, unique_paths, repeat(self.symbol))))
+        for df in map(loaded.get, paths):
             # print(df[(df["TckrSymb"]== f"{self.symbol}") & (df["FinInstrmTp"] == "STF")])
 
-            df["XpryDt"] = pd.to_datetime(df["XpryDt"], errors="coerce")
-            max_expiry = df["XpryDt"].max()
-            # print(max_expiry, self.symbol)
-            filtered_df = df[
-                (df["TckrSymb"] == f"{self.symbol}") 
-                &
-                (df["FinInstrmTp"] == "STF")
-            ]
+            filtered_df = df[df["FinInstrmTp"] == "STF"]
             if not filtered_df.empty:
                 print(f"{self.symbol}", filtered_df)
             else:
                 print("No records found for symbol: its index", self.symbol)
-                filtered_df = df[
-                    (df["TckrSymb"] == f"{self.symbol}") 
-                    &
-                    (df["FinInstrmTp"] == "IDF")
-                ]
+                filtered_df = df[df["FinInstrmTp"] == "IDF"]
                 # print(filtered_df)
             # print(
             #     filtered_df["TradDt"],
@@ -626,31 +741,10 @@ class FuDataSheetCreator:
 
             # )
             self.lot_size = filtered_df["NewBrdLotQty"].iloc[0]
-            for xd in filtered_df["XpryDt"]:
-                # print(
-                #     (filtered_df[filtered_df["XpryDt"]==f"{xd.date()}"])["TradDt"],
-                #     type((filtered_df[filtered_df["XpryDt"]==f"{xd.date()}"])["TradDt"])
-                # )
-                key = xd.strftime("%Y-%m-%d")
-                mask = filtered_df["XpryDt"] == xd
-                # print(mask)
-                trad_dates = pd.to_datetime(filtered_df.loc[mask, "TradDt"]).dt.date
-                # print(trad_dates.tolist())
-                # pd.to_datetime(value).date()
+            # One group per expiry (in file order) instead of a mask per row
+            expiry_keys = filtered_df["XpryDt"].dt.strftime("%Y-%m-%d")
+            for key, trad_dates in filtered_df["TradDt"].dt.date.groupby(expiry_keys, sort=False):
                 self.start_dates_dist[key].extend(trad_dates.tolist())
-                # value = (filtered_df[filtered_df["XpryDt"]==f"{xd.date()}"])["TradDt"]
-                # self.start_dates_dist[key].append(
-                #     pd.to_datetime(value).date()
-                # )
-                # self.start_dates_dist[key].append((filtered_df[filtered_df["XpryDt"]==f"{xd.date()}"])["TradDt"])
-                # print(type(xd))
-                # print(filtered_df[filtered_df["XpryDt"]==f"{xd.date()}"])
-                # if xd not in self.expiries:
-                    # for sd in (filtered_df[filtered_df["XpryDt"]==f"{xd.date()}"])["TradDt"]:
-                    #     print("start_dates", sd)
-                    #     print("expiries", xd)
-        #                 self.start_dates.append(sd)
-                    # self.expiries.append(xd)
         # print(
         #     self.start_dates,
         #     self.expiries
@@ -1,14 +1,13 @@
 #!/usr/bin/env python3
 """
-EqData Sheet Generator for ABB Stock
-Creates complete Equity Daily Data sheet with realistic OHLC, volume, and delivery data
+EqData Sheet Generator
+Creates the Equity Daily Data sheet from the daily NSE equity CSVs
 
 Features:
-- Realistic price movements with trends
-- Volume patterns with spikes
-- Delivery percentage calculations
+- Daily OHLC, volume and delivery data per symbol
+- Running averages of traded/deliverable quantity and delivery %
+- Simulated price/volume data via generate_equity_data()
 - Full Excel formatting
-- Technical indicators
 
 Author: Arun - Aryan Tech World Private Limited
 Date: December 15, 2025
@@ -17,15 +16,131 @@ Date: December 15, 2025
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import CellIsRule
 from openpyxl.utils import get_column_letter
+import os
 import random
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from nse_http import get_logger
+
+logger = get_logger(__name__)
+
+
+# Columns create_equity_data reads from each daily equity CSV
+EQ_COLUMNS = frozenset({
+    "TckrSymb", "SctySrs",
+    "CH_SYMBOL", "CH_SERIES", "mTIMESTAMP",
+    "CH_PREVIOUS_CLS_PRICE", "CH_OPENING_PRICE", "CH_TRADE_HIGH_PRICE",
+    "CH_TRADE_LOW_PRICE", "CH_LAST_TRADED_PRICE", "CH_CLOSING_PRICE",
+    "CH_TOT_TRADED_QTY", "CH_TOT_TRADED_VAL", "COP_DELIV_QTY", "COP_DELIV_PERC",
+})
+EQ_DTYPES = {"TckrSymb": "category", "SctySrs": "category"}
+# Each daily CSV is indexed by these columns, so a symbol's rows are a lookup
+EQ_INDEX = ["TckrSymb", "SctySrs"]
+
+# EqData columns taken straight from a daily CSV column
+EQ_SOURCE_COLUMNS = {
+    'Symbol': "CH_SYMBOL",
+    'Series': "CH_SERIES",
+    'Date': "mTIMESTAMP",
+    'Traded_Qty': "CH_TOT_TRADED_QTY",
+    'Deliverable_Qty': "COP_DELIV_QTY",
+    'Delivery_Pct': "COP_DELIV_PERC",
+    'Prev_Close': "CH_PREVIOUS_CLS_PRICE",
+    'Open': "CH_OPENING_PRICE",
+    'High': "CH_TRADE_HIGH_PRICE",
+    'Low': "CH_TRADE_LOW_PRICE",
+    'Last': "CH_LAST_TRADED_PRICE",
+    'Close': "CH_CLOSING_PRICE",
+    'Average': "CH_CLOSING_PRICE",
+    'Total_Traded_Qty': "CH_TOT_TRADED_QTY",  # Same as Traded_Qty
+}
+
+# Threads used to read the daily CSVs; the parse itself runs in pandas' C code
+READ_WORKERS = 8
+
+# Indexed daily frames of the current date list, by path (see _load_eq_days)
+_EQ_FRAMES = {}
+_EQ_FRAMES_LOCK = threading.Lock()
+
+
+def _running_mean(series):
+    """Cumulative mean of `series` (Series or array), like .expanding().mean() (NaN values are skipped)"""
+    values = np.asarray(series, dtype=float)
+    valid = ~np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        return np.cumsum(np.where(valid, values, 0.0)) / np.cumsum(valid)
+
+
+def _load_eq_csv(path):
+    """
+    The EQ_COLUMNS of the daily CSV at `path`, indexed and sorted by
+    (TckrSymb, SctySrs) so a symbol's rows are found by a sorted lookup
+    rather than a full-column mask
+    """
+    df = pd.read_csv(path, usecols=lambda c: c in EQ_COLUMNS, dtype=EQ_DTYPES)
+    return df.set_index(EQ_INDEX).sort_index()
+
+
+def _load_eq_days(paths):
+    """
+    The _load_eq_csv frames for `paths`, reading the uncached ones in
+    parallel. Every symbol built in this process reads the same daily files,
+    so the frames are kept for the next symbol, but only for this date list:
+    frames of other paths are dropped, so the cache never outgrows one run's
+    dates. Callers must not modify the returned DataFrames.
+    """
+    with _EQ_FRAMES_LOCK:
+        for stale in _EQ_FRAMES.keys() - set(paths):
+            del _EQ_FRAMES[stale]
+        missing = [path for path in paths if path not in _EQ_FRAMES]
+        if missing:
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+                _EQ_FRAMES.update(zip(missing, executor.map(_load_eq_csv, missing)))
+        return [_EQ_FRAMES[path] for path in paths]
+
 
 class EqDataSheetCreator:
     """Create EqData sheet with daily equity trading data"""
     
+    # eq_data columns written to sheet columns A..P (Q is left blank)
+    DATA_COLUMNS = ['Symbol', 'Series', 'Date', 'Traded_Qty', 'Deliverable_Qty',
+                    'Delivery_Pct', 'Prev_Close', 'Open', 'High', 'Low', 'Last',
+                    'Close', 'Average', 'Total_Traded_Qty', 'Turnover_Lacs',
+                    'Average_Traded_Qty']
+    
+    # Number format of each data column: dates, quantities (no decimals),
+    # delivery % and prices (2 decimals), turnover and averages (2 decimals)
+    NUMBER_FORMATS = {
+        3: 'DD-MMM-YY',
+        4: '#,##0', 5: '#,##0', 14: '#,##0',
+        6: '0.00',
+        7: '0.00', 8: '0.00', 9: '0.00', 10: '0.00', 11: '0.00', 12: '0.00', 13: '0.00',
+        15: '#,##0.00',
+        16: '#,##0.00', 19: '#,##0.00', 20: '#,##0.00',
+    }
+    
+    # Data rows are styled across columns A:T
+    BODY_COLUMNS = 20
+    
+    # Cell styles, registered on the workbook once as named styles so each cell
+    # takes a style by name instead of re-hashing its font/fill/border
+    THIN_BORDER = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    HEADER_STYLE = 'eq_header'
+    BODY_STYLE = 'eq_body'
+    
     def __init__(self, symbol='ABB', series='EQ'):
         self.symbol = symbol
         self.series = series
@@ -39,6 +154,9 @@ class EqDataSheetCreator:
         self.avg_volume = 400000
         self.volume_volatility = 0.3
         
+        # Random generator for the simulated series (PCG64, drawn in bulk)
+        self._rng = np.random.default_rng()
+        
         # Date range
         self.start_date = datetime(2023, 12, 28)
         self.end_date = datetime(2025, 9, 12)
@@ -61,67 +179,47 @@ class EqDataSheetCreator:
             DataFrame with Open, High, Low, Close, Prev_Close
         """
         
-        prices = []
-        prev_close = self.base_price
-        
-        for i in range(n_days):
-            # Determine trend phase
-            cycle_pos = (i % 60) / 60  # 60-day cycle
-            
-            if cycle_pos < 0.3:
-                # Uptrend phase
-                trend = 0.002
-            elif cycle_pos < 0.6:
-                # Sideways phase
-                trend = 0.0
-            else:
-                # Downtrend phase
-                trend = -0.0015
-            
-            # Random walk with trend
-            daily_return = np.random.normal(trend, self.volatility)
-            
-            # Calculate close price
-            close = prev_close * (1 + daily_return)
-            
-            # Generate OHLC around close
-            daily_range = close * np.random.uniform(0.015, 0.03)  # 1.5-3% daily range
-            
-            open_price = prev_close * (1 + np.random.uniform(-0.005, 0.005))
-            
-            # High and Low based on the range
-            if daily_return > 0:
-                # Bullish day
-                high = max(open_price, close) + np.random.uniform(0, daily_range * 0.5)
-                low = min(open_price, close) - np.random.uniform(0, daily_range * 0.3)
-            else:
-                # Bearish day
-                high = max(open_price, close) + np.random.uniform(0, daily_range * 0.3)
-                low = min(open_price, close) - np.random.uniform(0, daily_range * 0.5)
-            
-            # Ensure OHLC consistency
-            high = max(high, open_price, close)
-            low = min(low, open_price, close)
-            
-            # Last price (typically close to close)
-            last = close + np.random.uniform(-daily_range * 0.05, daily_range * 0.05)
-            
-            # Average price (VWAP approximation)
-            average = (open_price + high + low + close) / 4
-            
-            prices.append({
-                'Prev_Close': round(prev_close, 2),
-                'Open': round(open_price, 2),
-                'High': round(high, 2),
-                'Low': round(low, 2),
-                'Last': round(last, 2),
-                'Close': round(close, 2),
-                'Average': round(average, 2)
-            })
-            
-            prev_close = close
-        
-        return pd.DataFrame(prices)
+        # Determine trend phase for every day at once (60-day cycle)
+        cycle_pos = (np.arange(n_days) % 60) / 60
+        trend = np.select(
+            [cycle_pos < 0.3, cycle_pos < 0.6],
+            [0.002, 0.0],      # Uptrend phase, sideways phase
+            default=-0.0015,   # Downtrend phase
+        )
+        
+        # Random walk with trend: each close compounds the previous day's return
+        daily_return = self._rng.normal(trend, self.volatility)
+        close = self.base_price * np.cumprod(1 + daily_return)
+        # [:n_days] keeps the lengths equal when n_days is 0
+        prev_close = np.concatenate(([self.base_price], close))[:n_days]
+        
+        # Generate OHLC around close
+        daily_range = close * self._rng.uniform(0.015, 0.03, n_days)  # 1.5-3% daily range
+        
+        open_price = prev_close * (1 + self._rng.uniform(-0.005, 0.005, n_days))
+        
+        # High and Low based on the range: bullish days reach further up,
+        # bearish days further down. Adding a non-negative offset to
+        # max(open, close) / subtracting from min(open, close) keeps OHLC consistent
+        bullish = daily_return > 0
+        high = np.maximum(open_price, close) + self._rng.uniform(0, daily_range * np.where(bullish, 0.5, 0.3))
+        low = np.minimum(open_price, close) - self._rng.uniform(0, daily_range * np.where(bullish, 0.3, 0.5))
+        
+        # Last price (typically close to close)
+        last = close + self._rng.uniform(-daily_range * 0.05, daily_range * 0.05)
+        
+        # Average price (VWAP approximation)
+        average = (open_price + high + low + close) / 4
+        
+        return pd.DataFrame({
+            'Prev_Close': np.round(prev_close, 2),
+            'Open': np.round(open_price, 2),
+            'High': np.round(high, 2),
+            'Low': np.round(low, 2),
+            'Last': np.round(last, 2),
+            'Close': np.round(close, 2),
+            'Average': np.round(average, 2)
+        })
     
     def generate_volume_data(self, n_days, price_data):
         """
@@ -131,166 +229,69 @@ class EqDataSheetCreator:
             DataFrame with Traded_Qty, Deliverable_Qty, Delivery_Pct
         """
         
-        volume_data = []
-        
-        for i in range(n_days):
-            # Base volume with randomness
-            base_vol = self.avg_volume * np.random.lognormal(0, self.volume_volatility)
-            
-            # Volume spikes on volatile days
-            price_change = abs(price_data.iloc[i]['Close'] - price_data.iloc[i]['Prev_Close'])
-            price_change_pct = price_change / price_data.iloc[i]['Prev_Close']
-            
-            if price_change_pct > 0.03:  # 3% move
-                base_vol *= np.random.uniform(1.5, 3.0)  # Volume spike
-            
-            # Occasional ultra-high volume days
-            if np.random.random() < 0.05:  # 5% chance
-                base_vol *= np.random.uniform(3.0, 8.0)
-            
-            traded_qty = int(base_vol)
-            traded_qty = max(traded_qty, 10000)  # Minimum volume
-            
-            # Delivery percentage (typically 30-60%)
-            # Higher delivery on uptrends
-            if price_data.iloc[i]['Close'] > price_data.iloc[i]['Prev_Close']:
-                delivery_pct = np.random.uniform(40, 65)
-            else:
-                delivery_pct = np.random.uniform(30, 50)
-            
-            # Occasional very high delivery days
-            if np.random.random() < 0.1:  # 10% chance
-                delivery_pct = np.random.uniform(60, 75)
-            
-            deliverable_qty = int(traded_qty * delivery_pct / 100)
-            
-            # Turnover calculation
-            # Turnover = Volume * Average Price / 100000 (for Lacs)
-            turnover = (traded_qty * price_data.iloc[i]['Average']) / 100000
-            
-            volume_data.append({
-                'Traded_Qty': traded_qty,
-                'Deliverable_Qty': deliverable_qty,
-                'Delivery_Pct': round(delivery_pct, 2),
-                'Turnover_Lacs': round(turnover, 2)
-            })
-        
-        return pd.DataFrame(volume_data)
-    
-    def create_equity_data(self):
-        """Generate complete equity data"""
+        # Price columns as arrays, read once instead of via iloc per day
+        close = price_data['Close'].to_numpy()
+        prev_close = price_data['Prev_Close'].to_numpy()
+        average = price_data['Average'].to_numpy()
         
-        print("\n" + "="*70)
-        print("Generating Equity Daily Data for ABB")
-        print("="*70)
-        print("2")
+        # Base volume with randomness
+        base_vol = self.avg_volume * self._rng.lognormal(0, self.volume_volatility, n_days)
         
-        # Generate dates
-        dates = self.start_dates_dist
-        # print(
-        #     dates,"hello"
-        # )
-        # self.generate_business_days()
+        # Volume spikes on volatile days (3% move)
+        price_change_pct = np.abs(close - prev_close) / prev_close
+        base_vol *= np.where(price_change_pct > 0.03, self._rng.uniform(1.5, 3.0, n_days), 1.0)
+        
+        # Occasional ultra-high volume days (5% chance)
+        ultra = self._rng.random(n_days) < 0.05
+        base_vol[ultra] *= self._rng.uniform(3.0, 8.0, ultra.sum())
+        
+        traded_qty = np.maximum(base_vol.astype(np.int64), 10000)  # Minimum volume
+        
+        # Delivery percentage (typically 30-60%)
+        # Higher delivery on uptrends
+        delivery_pct = np.where(
+            close > prev_close,
+            self._rng.uniform(40, 65, n_days),
+            self._rng.uniform(30, 50, n_days),
+        )
+        
+        # Occasional very high delivery days (10% chance)
+        high_delivery = self._rng.random(n_days) < 0.1
+        delivery_pct[high_delivery] = self._rng.uniform(60, 75, high_delivery.sum())
+        
+        deliverable_qty = (traded_qty * delivery_pct / 100).astype(np.int64)
+        
+        # Turnover calculation
+        # Turnover = Volume * Average Price / 100000 (for Lacs)
+        turnover = (traded_qty * average) / 100000
+        
+        return pd.DataFrame({
+            'Traded_Qty': traded_qty,
+            'Deliverable_Qty': deliverable_qty,
+            'Delivery_Pct': np.round(delivery_pct, 2),
+            'Turnover_Lacs': np.round(turnover, 2)
+        })
+    
+    def generate_equity_data(self):
+        """
+        Generate a simulated EqData frame for the symbol over
+        start_date..end_date (business days), with the same columns as
+        create_equity_data plus Five_Day_Down
+        """
+        dates = self.generate_business_days()
         n_days = len(dates)
-        p_data = []
-        for i, date in enumerate(dates):
-            print(i, date)
-            # print(
-            #     pd.to_datetime(date, format="%d-%b-%Y").strftime("%Y%m%d")
-            # )
-            from pathlib import Path
-            file_path = Path(date)
-            # Path(f"../NSE_Downloads/eq_security/ABB_Equity_{pd.to_datetime(date, format='%d-%b-%Y').strftime('%Y%m%d')}.csv")
-
-            if file_path.exists():
-                print(f"{file_path} File exists")
-                df = pd.read_csv(file_path)
-                print(f's {df["TckrSymb"]} e')
-                filter_df = df[
-                    (df["TckrSymb"] == self.symbol)
-                    &
-                    (df["SctySrs"] == 'EQ')
-                ]
-                print(filter_df["TckrSymb"])
-                if filter_df.empty:
-                    continue
-                # print(
-                #     type(df),
-                #     type(df.to_json(orient="records", indent=2))
-                # )
-                import json
-                price_data = json.loads(df.to_json(orient="records"))[0]
-                # print(
-                #     type(price_data),
-                #     price_data[0]
-                # )
-                # volume_data = self.generate_volume_data(n_days, price_data)
-                # print(
-                #     price_data,
-                #     volume_data
-                # )
-                # {
-                #     "CH_SYMBOL":"ABB",
-                #     "CH_SERIES":"EQ",
-                #     "mTIMESTAMP":"01-Jan-2024",
-                #     "CH_PREVIOUS_CLS_PRICE":4674.85,
-                #     "CH_OPENING_PRICE":4674.85,
-                #     "CH_TRADE_HIGH_PRICE":4715,
-                #     "CH_TRADE_LOW_PRICE":4653.8,
-                #     "CH_LAST_TRADED_PRICE":4668,
-                #     "CH_CLOSING_PRICE":4682.2,
-                #     "VWAP":4683.19,
-                #     "CH_TOT_TRADED_QTY":84544,
-                #     "CH_TOT_TRADED_VAL":395935611.6999999881,
-                #     "CH_TOTAL_TRADES":12510,
-                #     "CH_TIMESTAMP":"2023-12-31T18:30:00.000+00:00",
-                #     "COP_DELIV_QTY":33919,
-                #     "COP_DELIV_PERC":40.12
-                # }
-                # print(price_data, type(price_data))
-                _list = {
-                    'Symbol': price_data['CH_SYMBOL'],
-                    'Series': price_data['CH_SERIES'],
-                    'Date': price_data['mTIMESTAMP'],
-                    'Traded_Qty': price_data['CH_TOT_TRADED_QTY'],
-                    'Deliverable_Qty': price_data['COP_DELIV_QTY'],
-                    'Delivery_Pct': price_data['COP_DELIV_PERC'],
-                    'Prev_Close': price_data['CH_PREVIOUS_CLS_PRICE'],
-                    'Open': price_data['CH_OPENING_PRICE'],
-                    'High': price_data['CH_TRADE_HIGH_PRICE'],
-                    'Low': price_data['CH_TRADE_LOW_PRICE'],
-                    'Last': price_data['CH_LAST_TRADED_PRICE'],
-                    'Close': price_data['CH_CLOSING_PRICE'],
-                    'Average': price_data['CH_CLOSING_PRICE'],
-                    'Total_Traded_Qty': price_data['CH_TOT_TRADED_QTY'],  # Same as Traded_Qty
-                    'Turnover_Lacs': int(price_data['CH_TOT_TRADED_VAL']/100000)
-                }
-
-                print(
-                    type(_list)
-                )
-                p_data.append(_list)
-                # eq_data = pd.DataFrame()
-                # print(eq_data)
-        #
-        eq_data = pd.DataFrame(p_data)
-        eq_data['Average_Traded_Qty'] = eq_data['Traded_Qty'].expanding().mean()
-        eq_data['Average_Deliverable_Qty'] = eq_data['Deliverable_Qty'].expanding().mean()
-        eq_data['Average_Delivery_Pct'] = eq_data['Delivery_Pct'].expanding().mean()
-        print(eq_data)
-        return eq_data
         
-        print(f"\nGenerating data for {n_days} trading days...")
-        print(f"Date Range: {dates[0].strftime('%Y-%m-%d')} to {dates[-1].strftime('%Y-%m-%d')}")
+        logger.info("Generating data for %d trading days...", n_days)
+        if n_days:
+            logger.info("Date Range: %s to %s", dates[0].strftime('%Y-%m-%d'), dates[-1].strftime('%Y-%m-%d'))
         
         # Generate price data
         price_data = self.generate_price_data(n_days)
-        print(f"✓ Generated price data (OHLC) {price_data}")
+        logger.info("✓ Generated price data (OHLC)")
         
-
         # Generate volume data
         volume_data = self.generate_volume_data(n_days, price_data)
-        print(f"✓ Generated volume and delivery data")
+        logger.info("✓ Generated volume and delivery data")
         
         # Combine all data
         eq_data = pd.DataFrame({
@@ -312,32 +313,77 @@ class EqDataSheetCreator:
         })
         
         # Calculate additional metrics
-        eq_data['Average_Traded_Qty'] = eq_data['Traded_Qty'].expanding().mean()
-        eq_data['Average_Deliverable_Qty'] = eq_data['Deliverable_Qty'].expanding().mean()
-        eq_data['Average_Delivery_Pct'] = eq_data['Delivery_Pct'].expanding().mean()
+        eq_data['Average_Traded_Qty'] = _running_mean(eq_data['Traded_Qty'])
+        eq_data['Average_Deliverable_Qty'] = _running_mean(eq_data['Deliverable_Qty'])
+        eq_data['Average_Delivery_Pct'] = _running_mean(eq_data['Delivery_Pct'])
         
-        # Five Day Price Down flag
-        eq_data['Five_Day_Down'] = 'No'
-        for i in range(4, len(eq_data)):
-            last_5 = eq_data['Close'].iloc[i-4:i+1]
-            if all(last_5.diff().dropna() < 0):
-                eq_data.loc[i, 'Five_Day_Down'] = 'Yes'
+        # Five Day Price Down flag: the close fell on each of the last 4 days,
+        # i.e. a window of 4 consecutive down moves ending on that day
+        five_day_down = np.full(len(eq_data), 'No', dtype=object)
+        if len(eq_data) >= 5:
+            down = np.diff(eq_data['Close'].to_numpy()) < 0
+            falling = np.convolve(down.astype(np.int8), np.ones(4, dtype=np.int8), 'valid') == 4
+            five_day_down[4:][falling] = 'Yes'
+        eq_data['Five_Day_Down'] = five_day_down
         
-        print(f"✓ Calculated additional metrics")
+        logger.info("✓ Calculated additional metrics")
         
         return eq_data
     
+    def create_equity_data(self):
+        """Build the symbol's EqData rows (one per trading date) from the daily CSVs"""
+        
+        logger.info("Generating Equity Daily Data for %s", self.symbol)
+        
+        # Read every daily CSV once, in parallel, then combine only this
+        # symbol's EQ rows, looked up on each day's (TckrSymb, SctySrs) index
+        paths = [str(path) for path in self.start_dates_dist if os.path.exists(path)]
+        days = _load_eq_days(paths)
+        key = (self.symbol, 'EQ')
+        frames = []
+        for path, day in zip(paths, days):
+            if key not in day.index:
+                continue
+            rows = day.loc[[key]]
+            # One EqData row per trading date: a duplicated EQ row in a source
+            # CSV must not double the day, so only its first row is kept
+            if len(rows) > 1:
+                logger.warning("! %s has %d %s EQ rows, keeping the first", path, len(rows), self.symbol)
+                rows = rows.iloc[:1]
+            frames.append(rows)
+        filter_df = (pd.concat(frames, ignore_index=True) if frames
+                     else pd.DataFrame(columns=sorted(EQ_COLUMNS.difference(EQ_INDEX))))
+        
+        # Built from column arrays in one go: no per-date dicts, no copy of the
+        # arrays, and no frame rebuild per derived column
+        columns = {
+            column: filter_df[source].to_numpy()
+            for column, source in EQ_SOURCE_COLUMNS.items()
+        }
+        # mTIMESTAMP is '01-Jan-2024': parsed once for the whole column, so the
+        # sheet gets real dates for its DD-MMM-YY format
+        columns['Date'] = pd.to_datetime(columns['Date'], format='%d-%b-%Y', cache=True)
+        columns['Turnover_Lacs'] = (filter_df["CH_TOT_TRADED_VAL"].to_numpy(dtype=float) / 100000).astype(np.int64)
+        columns['Average_Traded_Qty'] = _running_mean(columns['Traded_Qty'])
+        columns['Average_Deliverable_Qty'] = _running_mean(columns['Deliverable_Qty'])
+        columns['Average_Delivery_Pct'] = _running_mean(columns['Delivery_Pct'])
+        eq_data = pd.DataFrame(columns, copy=False)
+        logger.debug("%s", eq_data)
+        return eq_data
+    
     def create_workbook(self, eq_data, filename):
         """Create Excel workbook with formatting"""
         
-        print("\nCreating Excel workbook...")
-        from openpyxl import load_workbook
-        from openpyxl import Workbook
-        import os
+        logger.info("Creating Excel workbook...")
         if os.path.exists(filename):
-            # Load existing workbook (keeps abc)
-            self.wb = load_workbook(filename)
-            print("exist")
+            # Load existing workbook (keeps its FuData sheet, so it cannot be
+            # rewritten from scratch); external links are not needed
+            self.wb = load_workbook(filename, keep_links=False)
+            # Replace the EqData sheet of an earlier run instead of adding
+            # EqData1, EqData2, ... that every later load would parse again
+            if "EqData" in self.wb.sheetnames:
+                del self.wb["EqData"]
+            logger.debug("Adding EqData to existing workbook %s", filename)
         else:
             # Create new workbook
             self.wb = Workbook()
@@ -365,39 +411,45 @@ class EqDataSheetCreator:
             'Average of % Dly Qty to Traded Qty '
         ]
         
+        self.register_styles()
         for col_idx, header in enumerate(headers, start=1):
-            cell = self.ws.cell(row=2, column=col_idx, value=header)
-            cell.font = Font(bold=True, size=10)
-            cell.fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        
-        # Data rows (starting from row 3)
-        for row_idx, (_, row_data) in enumerate(eq_data.iterrows(), start=3):
-            self.ws.cell(row=row_idx, column=1, value=row_data['Symbol'])
-            self.ws.cell(row=row_idx, column=2, value=row_data['Series'])
-            self.ws.cell(row=row_idx, column=3, value=row_data['Date'])
-            self.ws.cell(row=row_idx, column=4, value=row_data['Traded_Qty'])
-            self.ws.cell(row=row_idx, column=5, value=row_data['Deliverable_Qty'])
-            self.ws.cell(row=row_idx, column=6, value=row_data['Delivery_Pct'])
-            self.ws.cell(row=row_idx, column=7, value=row_data['Prev_Close'])
-            self.ws.cell(row=row_idx, column=8, value=row_data['Open'])
-            self.ws.cell(row=row_idx, column=9, value=row_data['High'])
-            self.ws.cell(row=row_idx, column=10, value=row_data['Low'])
-            self.ws.cell(row=row_idx, column=11, value=row_data['Last'])
-            self.ws.cell(row=row_idx, column=12, value=row_data['Close'])
-            self.ws.cell(row=row_idx, column=13, value=row_data['Average'])
-            self.ws.cell(row=row_idx, column=14, value=row_data['Total_Traded_Qty'])
-            self.ws.cell(row=row_idx, column=15, value=row_data['Turnover_Lacs'])
-            self.ws.cell(row=row_idx, column=16, value=row_data['Average_Traded_Qty'])
-            self.ws.cell(row=row_idx, column=17, value='')
-            # self.ws.cell(row=row_idx, column=18, value=row_data['Five_Day_Down'])
-            # self.ws.cell(row=row_idx, column=19, value=row_data['Average_Deliverable_Qty'])
-            # self.ws.cell(row=row_idx, column=20, value=row_data['Average_Delivery_Pct'])
+            self.ws.cell(row=2, column=col_idx, value=header).style = self.HEADER_STYLE
+        
+        # Data rows (starting from row 3), appended whole with each cell already
+        # styled, so apply_formatting does not walk the data cells again.
+        # Columns past the data (Q:T) are padded so they get the body borders too
+        formats = [self.NUMBER_FORMATS.get(column) for column in range(1, self.BODY_COLUMNS + 1)]
+        padding = ('',) + (None,) * (self.BODY_COLUMNS - len(self.DATA_COLUMNS) - 1)
+        for row in eq_data[self.DATA_COLUMNS].itertuples(index=False, name=None):
+            self.ws.append([self._body_cell(value, number_format)
+                            for value, number_format in zip(row + padding, formats)])
         
         # Apply formatting
         self.apply_formatting(len(eq_data))
         
-        print("✓ Excel workbook created with formatting")
+        logger.info("✓ Excel workbook created with formatting")
+    
+    def register_styles(self):
+        """Add the header and body named styles to the workbook, if not already there"""
+        if self.HEADER_STYLE not in self.wb.style_names:
+            self.wb.add_named_style(NamedStyle(
+                name=self.HEADER_STYLE,
+                font=Font(bold=True, size=10),
+                fill=PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid"),
+                alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+                border=self.THIN_BORDER,
+            ))
+        if self.BODY_STYLE not in self.wb.style_names:
+            self.wb.add_named_style(NamedStyle(name=self.BODY_STYLE, font=DEFAULT_FONT, border=self.THIN_BORDER))
+    
+    def _body_cell(self, value, number_format):
+        """Data row cell with the body style and the column's number format"""
+        cell = WriteOnlyCell(self.ws, value=value)
+        # The named style resets the number format, so it goes first
+        cell.style = self.BODY_STYLE
+        if number_format is not None:
+            cell.number_format = number_format
+        return cell
     
     def apply_formatting(self, n_rows):
         """Apply formatting to the sheet"""
@@ -413,51 +465,16 @@ class EqDataSheetCreator:
         for col, width in column_widths.items():
             self.ws.column_dimensions[col].width = width
         
-        # Format dates (column C)
-        for row in range(3, n_rows + 3):
-            date_cell = self.ws.cell(row=row, column=3)
-            date_cell.number_format = 'DD-MMM-YY'
-        
-        # Format numbers
-        for row in range(3, n_rows + 3):
-            # Quantities - no decimals
-            for col in [4, 5, 14]:
-                self.ws.cell(row=row, column=col).number_format = '#,##0'
-            
-            # Percentages - 2 decimals
-            self.ws.cell(row=row, column=6).number_format = '0.00'
-            
-            # Prices - 2 decimals
-            for col in [7, 8, 9, 10, 11, 12, 13]:
-                self.ws.cell(row=row, column=col).number_format = '0.00'
-            
-            # Turnover - 2 decimals
-            self.ws.cell(row=row, column=15).number_format = '#,##0.00'
-            
-            # Averages - 2 decimals
-            for col in [16, 19, 20]:
-                self.ws.cell(row=row, column=col).number_format = '#,##0.00'
-        
-        # Conditional formatting for Five Day Down
-        red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-        for row in range(3, n_rows + 3):
-            cell = self.ws.cell(row=row, column=18)
-            if cell.value == 'Yes':
-                cell.fill = red_fill
-        
-        # Add borders
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        for row in range(2, n_rows + 3):
-            for col in range(1, 21):
-                self.ws.cell(row=row, column=col).border = thin_border
+        # Conditional formatting for Five Day Down: one rule over column R,
+        # evaluated by Excel instead of checking every cell here
+        if n_rows:
+            red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+            self.ws.conditional_formatting.add(
+                f'R3:R{n_rows + 2}',
+                CellIsRule(operator='equal', formula=['"Yes"'], fill=red_fill)
+            )
         
-        print("✓ Applied formatting (dates, numbers, borders)")
+        logger.info("✓ Applied formatting (column widths, Five Day Down highlight)")
     
     def save_workbook(self, filename='ABB_EqData_Generated.xlsx'):
         """Save the workbook"""
@@ -471,7 +488,7 @@ class EqDataSheetCreator:
         #     # Create new workbook
             # self.wb = Workbook()
         self.wb.save(filename)
-        print(f"\n✓ Saved workbook: {filename}")
+        logger.info("✓ Saved workbook: %s", filename)
         return filename
     
     def create_eqdata_sheet(self, filename):
@@ -479,7 +496,6 @@ class EqDataSheetCreator:
         
         # Generate equity data
         eq_data = self.create_equity_data()
-        print("1")
         
         # Create Excel workbook
         self.create_workbook(eq_data, filename)